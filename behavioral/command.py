@@ -14,7 +14,22 @@ the base Button class. Put simply, your GUI code has become awkwardly
 dependent on the volatile code of the business logic.
 """
 
+import asyncio
+import contextlib
+import inspect
+import io
+import mmap
+import os
+import pickle
+import queue
+import random
+import struct
+import tempfile
+import threading
+import time
 from abc import ABC, abstractmethod
+from array import array
+from concurrent.futures import Future
 
 
 class Command(ABC):
@@ -22,47 +37,119 @@ class Command(ABC):
     Interface Command declares a method for executing a command.
     """
 
+    # True when execute() sets the receiver's whole state whatever it was
+    # before, so of several such commands in a row only the last one matters
+    sets_state = False
+
     @abstractmethod
     def execute(self) -> None:
         pass
 
+    def undo(self) -> None:
+        """Reverts what `execute` did."""
+        raise NotImplementedError(f"{type(self).__name__} cannot be undone")
+
+    @classmethod
+    def execute_batch(cls, commands: list["Command"]):
+        """Executes several commands of this type for one receiver; override to make it one call."""
+        return [command.execute() for command in commands]
+
+    @property
+    def receiver(self):
+        """
+        The object the command acts on. Queued invokers run commands for
+        the same receiver in submission order.
+        """
+        return None
+
 
 class GarageOpenCommand(Command):
     """
     Implements interface Command and provides open garage door functionality
     """
 
+    sets_state = True
+    # door state before the latest execute, which undo restores
+    was_open = None
+
     def __init__(self, garage_receiver):
         self._garage_receiver = garage_receiver
 
+    @property
+    def receiver(self):
+        return self._garage_receiver
+
     def execute(self) -> None:
         print("Command to open garage door.")
+        self.was_open = self._garage_receiver.is_open
         self._garage_receiver.open_door()
 
+    def undo(self) -> None:
+        print("Undo: command to open garage door, restoring its previous state.")
+        _restore_door(self._garage_receiver, self.was_open)
+
+    @classmethod
+    def execute_batch(cls, commands):
+        # opening an open door changes nothing, so one call covers the batch
+        return commands[-1].execute()
+
 
 class GarageCloseCommand(Command):
     """
     Implements interface Command and provides close garage door functionality
     """
 
+    sets_state = True
+    # door state before the latest execute, which undo restores
+    was_open = None
+
     def __init__(self, garage_receiver):
         self._garage_receiver = garage_receiver
 
+    @property
+    def receiver(self):
+        return self._garage_receiver
+
     def execute(self) -> None:
         print("Command to close garage door")
+        self.was_open = self._garage_receiver.is_open
         self._garage_receiver.close_door()
 
+    def undo(self) -> None:
+        print("Undo: command to close garage door, restoring its previous state")
+        _restore_door(self._garage_receiver, self.was_open)
+
+    @classmethod
+    def execute_batch(cls, commands):
+        return commands[-1].execute()
+
+
+def _restore_door(garage_receiver, was_open) -> None:
+    # opening or closing is not its own inverse: the door may already have
+    # been in that state, so put back whatever state it had before
+    if was_open is None:
+        raise RuntimeError("Command was never executed, nothing to undo")
+    if was_open:
+        garage_receiver.open_door()
+    else:
+        garage_receiver.close_door()
+
 
 class GarageReceiver:
     """
     Garage door endpoints to open and close the door
     """
 
+    def __init__(self):
+        self.is_open = False
+
     def open_door(self):
         print("Opening garage door.")
+        self.is_open = True
 
     def close_door(self):
         print("Closing garage door")
+        self.is_open = False
 
 
 class ApplicationInvoker:
@@ -84,6 +171,532 @@ class ApplicationInvoker:
         self._close_door.execute()
 
 
+def _shard(receiver, shards: int) -> int:
+    # object hashes come from addresses and share low bits; spread them first
+    return ((hash(receiver) * 0x9E3779B97F4A7C15) >> 32) % shards
+
+
+class QueuedInvoker:
+    """
+    Runs commands on a pool of worker threads instead of the caller's thread.
+
+    Every receiver is pinned to one worker, so commands for the same
+    receiver run in submission order while different receivers run in
+    parallel. Each worker has a bounded queue: `submit` blocks when it is
+    full, or raises queue.Full after `timeout` seconds.
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 1000):
+        self._queues = [queue.Queue(max_queue) for _ in range(workers)]
+        self._threads = [
+            threading.Thread(target=self._work, args=(q,), daemon=True) for q in self._queues
+        ]
+        self._next = 0
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, command: Command, timeout: float | None = None) -> Future:
+        future = Future()
+        self._queue_for(command).put((command, future), timeout=timeout)
+        return future
+
+    def shutdown(self) -> None:
+        """Run everything already submitted, then stop the workers."""
+        for q in self._queues:
+            q.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _queue_for(self, command: Command) -> queue.Queue:
+        receiver = command.receiver
+        if receiver is None:
+            self._next = (self._next + 1) % len(self._queues)
+            return self._queues[self._next]
+        return self._queues[_shard(receiver, len(self._queues))]
+
+    @staticmethod
+    def _work(q: queue.Queue) -> None:
+        while (item := q.get()) is not None:
+            command, future = item
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(command.execute())
+                except BaseException as e:
+                    future.set_exception(e)
+
+
+class AsyncQueuedInvoker:
+    """
+    asyncio variant of QueuedInvoker. `execute` may return an awaitable,
+    which is awaited; a blocking `execute` blocks the event loop.
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 1000):
+        self._queues = [asyncio.Queue(max_queue) for _ in range(workers)]
+        self._tasks = [asyncio.create_task(self._work(q)) for q in self._queues]
+        self._next = 0
+
+    async def submit(self, command: Command) -> asyncio.Future:
+        """Waits while the receiver's queue is full; returns a future for the result."""
+        future = asyncio.get_running_loop().create_future()
+        receiver = command.receiver
+        if receiver is None:
+            self._next = (self._next + 1) % len(self._queues)
+            q = self._queues[self._next]
+        else:
+            q = self._queues[_shard(receiver, len(self._queues))]
+        await q.put((command, future))
+        return future
+
+    async def shutdown(self) -> None:
+        for q in self._queues:
+            await q.put(None)
+        await asyncio.gather(*self._tasks)
+
+    @staticmethod
+    async def _work(q: asyncio.Queue) -> None:
+        while (item := await q.get()) is not None:
+            command, future = item
+            if future.cancelled():
+                continue
+            # the caller may cancel the future while the command runs, so
+            # check before settling it; raising here would kill the worker
+            try:
+                result = command.execute()
+                if inspect.isawaitable(result):
+                    result = await result
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+
+class SlowGarageReceiver(GarageReceiver):
+    """GarageReceiver stand-in where every door operation waits on simulated I/O."""
+
+    def __init__(self, latency=0.002):
+        super().__init__()
+        self.latency = latency
+        self.log = []
+
+    def open_door(self):
+        time.sleep(self.latency)
+        self.log.append('open')
+
+    def close_door(self):
+        time.sleep(self.latency)
+        self.log.append('close')
+
+
+# Coalescing: shrink bursts of commands before they reach the receivers
+
+class BatchCommand(Command):
+    """Consecutive commands of one type for one receiver, run through `execute_batch`."""
+
+    def __init__(self, commands: list[Command]):
+        self.commands = commands
+
+    @property
+    def receiver(self):
+        return self.commands[0].receiver
+
+    def execute(self):
+        return type(self.commands[0]).execute_batch(self.commands)
+
+
+class CoalescingRule(ABC):
+    """Rewrites the buffered commands of one receiver, oldest first."""
+
+    @abstractmethod
+    def apply(self, commands: list[Command]) -> list[Command]:
+        pass
+
+
+class LastWriteWins(CoalescingRule):
+    """Reduces each run of consecutive `sets_state` commands to its last command."""
+
+    def apply(self, commands):
+        kept = []
+        for command in commands:
+            if kept and command.sets_state and kept[-1].sets_state:
+                kept.pop()
+            kept.append(command)
+        return kept
+
+
+class CancelInversePairs(CoalescingRule):
+    """
+    Drops a command together with a directly preceding inverse. `inverses`
+    maps a command type to the type that undoes it from any state, such as
+    increment and decrement; commands that set an absolute state, like the
+    garage door commands, are not inverses in this sense.
+    """
+
+    def __init__(self, inverses: dict[type, type]):
+        self.inverses = inverses
+
+    def apply(self, commands):
+        kept = []
+        for command in commands:
+            if kept and self.inverses.get(type(kept[-1])) is type(command):
+                kept.pop()
+            else:
+                kept.append(command)
+        return kept
+
+
+class MergeSameType(CoalescingRule):
+    """Turns runs of same-type commands into one BatchCommand."""
+
+    def apply(self, commands):
+        merged = []
+        run = []
+        for command in commands + [None]:
+            if run and (command is None or type(command) is not type(run[0])):
+                merged.append(run[0] if len(run) == 1 else BatchCommand(run))
+                run = []
+            if command is not None:
+                run.append(command)
+        return merged
+
+
+class CoalescingInvoker:
+    """
+    Buffers submitted commands per receiver for `flush_interval` seconds,
+    rewrites each receiver's buffer with `rules`, and passes what is left to
+    `invoker` (a QueuedInvoker) or runs it inline on the flushing thread.
+
+    The future of a command that was coalesced away resolves to None once
+    its burst has been flushed; merged commands get the batch result.
+    Flushes run one at a time, so each receiver's bursts are dispatched in
+    submission order. `close()` flushes what is left; submitting after that
+    raises RuntimeError.
+    """
+
+    def __init__(self, invoker: QueuedInvoker | None = None, rules: list[CoalescingRule] | None = None,
+                 flush_interval: float = 0.01):
+        self.invoker = invoker
+        self.rules = rules if rules is not None else [LastWriteWins(), MergeSameType()]
+        self.flush_interval = flush_interval
+        self.submitted = 0
+        self.dispatched = 0
+        self._pending: dict[int, list[tuple[Command, Future]]] = {}
+        self._lock = threading.Lock()
+        # held from taking the buffers until they are dispatched, so an
+        # explicit flush() cannot overtake the flush loop, or vice versa
+        self._dispatch_lock = threading.Lock()
+        self._closed = False
+        self._stopped = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def submit(self, command: Command) -> Future:
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('CoalescingInvoker is closed')
+            self._pending.setdefault(id(command.receiver), []).append((command, future))
+            self.submitted += 1
+        return future
+
+    def flush(self) -> None:
+        with self._dispatch_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for items in pending.values():
+                self._dispatch(items)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        self._stopped.set()
+        self._flusher.join()
+        self.flush()
+
+    def _flush_loop(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def _dispatch(self, items: list[tuple[Command, Future]]) -> None:
+        commands = [command for command, _ in items]
+        for rule in self.rules:
+            commands = rule.apply(commands)
+        self.dispatched += len(commands)
+
+        owners = {}  # id of an original command -> future of what runs it
+        for command in commands:
+            future = self._run(command)
+            for original in command.commands if isinstance(command, BatchCommand) else [command]:
+                owners[id(original)] = future
+        for command, future in items:
+            owner = owners.get(id(command))
+            if owner is None:
+                future.set_result(None)
+            else:
+                owner.add_done_callback(lambda done, future=future: _copy_outcome(done, future))
+
+    def _run(self, command: Command) -> Future:
+        if self.invoker is not None:
+            return self.invoker.submit(command)
+        future = Future()
+        try:
+            future.set_result(command.execute())
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def _copy_outcome(source: Future, target: Future) -> None:
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+# Command history: undo/redo backed by an append-only journal
+
+# Commands the journal can record, by opcode
+JOURNALED_COMMANDS = [GarageOpenCommand, GarageCloseCommand]
+_OPCODES = {command: opcode for opcode, command in enumerate(JOURNALED_COMMANDS)}
+
+EXECUTE, UNDO, REDO = 0, 1, 2
+# kind, opcode, receiver key; the opcode's top bit is the door state before the step
+_RECORD = struct.Struct('<BBI')
+_WAS_OPEN = 1 << 39
+
+
+class Journal(ABC):
+    """
+    Append-only log of fixed-size records plus the latest snapshot. Each
+    snapshot starts a new generation and empties the log, so records that
+    predate the snapshot are never replayed on top of it.
+    """
+
+    @abstractmethod
+    def append(self, record: bytes) -> None:
+        pass
+
+    @abstractmethod
+    def records(self) -> memoryview:
+        """The log written since the latest snapshot."""
+        pass
+
+    @abstractmethod
+    def save_snapshot(self, snapshot: bytes) -> None:
+        """Store `snapshot` and start a new, empty log."""
+        pass
+
+    @abstractmethod
+    def load_snapshot(self) -> bytes | None:
+        pass
+
+    def size(self) -> int:
+        """Bytes used by the log and the snapshot."""
+        return len(self.records()) + len(self.load_snapshot() or b'')
+
+
+class MemoryJournal(Journal):
+    def __init__(self):
+        self._log = bytearray()
+        self._snapshot = None
+
+    def append(self, record: bytes) -> None:
+        self._log += record
+
+    def records(self) -> memoryview:
+        return memoryview(self._log)
+
+    def save_snapshot(self, snapshot: bytes) -> None:
+        self._snapshot = snapshot
+        self._log = bytearray()
+
+    def load_snapshot(self) -> bytes | None:
+        return self._snapshot
+
+
+class MmapJournal(Journal):
+    """
+    Journal kept in `<path>.log`, an mmap'd file, and `<path>.snap`. The log
+    header holds the generation and the number of bytes written, so a
+    crash mid-append only loses the record being written.
+    """
+
+    _HEADER = struct.Struct('<QQ')  # generation, used bytes
+
+    def __init__(self, path: str, capacity: int = 1024 * 1024):
+        self._log_path = f'{path}.log'
+        self._snapshot_path = f'{path}.snap'
+        self._file = open(self._log_path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size < self._HEADER.size:
+            self._file.truncate(max(capacity, self._HEADER.size))
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._generation, self._used = self._HEADER.unpack_from(self._map)
+        snapshot_generation = self._snapshot_generation()
+        if self._generation < snapshot_generation:
+            # crashed after writing a snapshot but before resetting the log
+            self._reset(snapshot_generation)
+
+    def append(self, record: bytes) -> None:
+        end = self._HEADER.size + self._used + len(record)
+        if end > len(self._map):
+            self._grow(end)
+        self._map[end - len(record):end] = record
+        self._used += len(record)
+        self._HEADER.pack_into(self._map, 0, self._generation, self._used)
+
+    def records(self) -> memoryview:
+        return memoryview(self._map)[self._HEADER.size:self._HEADER.size + self._used]
+
+    def save_snapshot(self, snapshot: bytes) -> None:
+        generation = self._generation + 1
+        tmp = f'{self._snapshot_path}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(struct.pack('<Q', generation))
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._snapshot_path)
+        self._reset(generation)
+
+    def load_snapshot(self) -> bytes | None:
+        try:
+            with open(self._snapshot_path, 'rb') as f:
+                return f.read()[8:]
+        except FileNotFoundError:
+            return None
+
+    def flush(self) -> None:
+        self._map.flush()
+
+    def close(self) -> None:
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+    def _snapshot_generation(self) -> int:
+        try:
+            with open(self._snapshot_path, 'rb') as f:
+                return struct.unpack('<Q', f.read(8))[0]
+        except FileNotFoundError:
+            return 0
+
+    def _reset(self, generation: int) -> None:
+        self._generation, self._used = generation, 0
+        self._HEADER.pack_into(self._map, 0, generation, 0)
+        self._map.flush()
+
+    def _grow(self, needed: int) -> None:
+        size = len(self._map)
+        while size < needed:
+            size *= 2
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+
+class CommandHistory:
+    """
+    Executes commands with undo/redo and records every step in a journal.
+
+    `receivers` maps a small integer key to each receiver the journaled
+    commands may act on. Undo and redo stacks are kept as packed integers
+    holding the command, its receiver and the state undo goes back to.
+    Every `snapshot_every` steps the receivers' state and both stacks are
+    snapshotted and the log is compacted, so `recover` only replays the
+    steps taken since the latest snapshot.
+    """
+
+    def __init__(self, receivers: dict[int, object], journal: Journal | None = None,
+                 snapshot_every: int | None = 100_000):
+        self._receivers = receivers
+        self._keys = {id(receiver): key for key, receiver in receivers.items()}
+        self.journal = journal or MemoryJournal()
+        self.snapshot_every = snapshot_every
+        self._undo = array('Q')
+        self._redo = array('Q')
+        self._steps = 0
+
+    def execute(self, command: Command):
+        result = command.execute()
+        packed = self._pack(command)
+        self._undo.append(packed)
+        del self._redo[:]
+        self._record(EXECUTE, packed)
+        return result
+
+    def undo(self) -> None:
+        if not self._undo:
+            raise IndexError('Nothing to undo')
+        packed = self._undo.pop()
+        self._command(packed).undo()
+        self._redo.append(packed)
+        self._record(UNDO, packed)
+
+    def redo(self) -> None:
+        if not self._redo:
+            raise IndexError('Nothing to redo')
+        command = self._command(self._redo.pop())
+        command.execute()
+        packed = self._pack(command)
+        self._undo.append(packed)
+        self._record(REDO, packed)
+
+    def snapshot(self) -> None:
+        state = {
+            'receivers': {key: vars(receiver) for key, receiver in self._receivers.items()},
+            'undo': self._undo.tobytes(),
+            'redo': self._redo.tobytes(),
+        }
+        self.journal.save_snapshot(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+
+    @classmethod
+    def recover(cls, receivers: dict[int, object], journal: Journal,
+                snapshot_every: int | None = 100_000) -> 'CommandHistory':
+        """Rebuild receivers and history from the latest snapshot plus the log after it."""
+        history = cls(receivers, journal, snapshot_every)
+        snapshot = journal.load_snapshot()
+        if snapshot is not None:
+            state = pickle.loads(snapshot)
+            for key, receiver_state in state['receivers'].items():
+                vars(receivers[key]).update(receiver_state)
+            history._undo.frombytes(state['undo'])
+            history._redo.frombytes(state['redo'])
+        replay = {EXECUTE: history._replay_execute, UNDO: history._replay_undo, REDO: history._replay_redo}
+        for kind, opcode, key in _RECORD.iter_unpack(journal.records()):
+            replay[kind]((opcode << 32) | key)
+        return history
+
+    def _pack(self, command: Command) -> int:
+        packed = (_OPCODES[type(command)] << 32) | self._keys[id(command.receiver)]
+        return packed | _WAS_OPEN if command.was_open else packed
+
+    def _command(self, packed: int) -> Command:
+        command = JOURNALED_COMMANDS[(packed >> 32) & 0x7F](self._receivers[packed & 0xFFFFFFFF])
+        command.was_open = bool(packed & _WAS_OPEN)
+        return command
+
+    def _record(self, kind: int, packed: int) -> None:
+        self.journal.append(_RECORD.pack(kind, packed >> 32, packed & 0xFFFFFFFF))
+        self._steps += 1
+        if self.snapshot_every and self._steps % self.snapshot_every == 0:
+            self.snapshot()
+
+    def _replay_execute(self, packed: int) -> None:
+        self._command(packed).execute()
+        self._undo.append(packed)
+        del self._redo[:]
+
+    def _replay_undo(self, packed: int) -> None:
+        self._command(self._undo.pop()).undo()
+        self._redo.append(packed)
+
+    def _replay_redo(self, packed: int) -> None:
+        self._command(self._redo.pop()).execute()
+        self._undo.append(packed)
+
+
 def test():
     # create object for class ApplicationInvoker
     app = ApplicationInvoker()
@@ -94,3 +707,129 @@ def test():
 
     # let's close the door
     app.invoke_close_door()
+
+
+def benchmark(receivers=32, commands=20, latency=0.002):
+    """Commands/sec through QueuedInvoker as the worker count grows."""
+    # the commands print on every execute; keep that out of the output
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = []
+        for workers in (1, 2, 4, 8, 16, 32):
+            garages = [SlowGarageReceiver(latency) for _ in range(receivers)]
+            invoker = QueuedInvoker(workers)
+            start = time.perf_counter()
+            futures = []
+            for i in range(commands):
+                for garage in garages:
+                    command_class = GarageOpenCommand if i % 2 == 0 else GarageCloseCommand
+                    futures.append(invoker.submit(command_class(garage)))
+            for future in futures:
+                future.result()
+            elapsed = time.perf_counter() - start
+            invoker.shutdown()
+            assert all(g.log == ['open', 'close'] * (commands // 2) for g in garages)
+            rows.append(f'{workers:>3} workers: {len(futures) / elapsed:,.0f} commands/s')
+    print('\n'.join(rows))
+
+
+class QuietGarageReceiver(GarageReceiver):
+    """GarageReceiver that keeps state without printing, for benchmarks."""
+
+    def open_door(self):
+        self.is_open = True
+
+    def close_door(self):
+        self.is_open = False
+
+
+def benchmark_history(commands=1_000_000, garages=100, snapshot_every=100_000, undos=10_000):
+    """Journal size and recovery time after `commands` steps, with and without snapshots."""
+    with tempfile.TemporaryDirectory() as root, open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        rows = []
+        for every in (None, snapshot_every):
+            path = os.path.join(root, f'history-{every}')
+            receivers = {key: QuietGarageReceiver() for key in range(garages)}
+            journal = MmapJournal(path)
+            history = CommandHistory(receivers, journal, every)
+            start = time.perf_counter()
+            for i in range(commands):
+                command_class = GarageOpenCommand if i % 3 else GarageCloseCommand
+                history.execute(command_class(receivers[i % garages]))
+            elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(undos):
+                history.undo()
+            undo_elapsed = time.perf_counter() - start
+            size = journal.size()
+            expected = {key: receiver.is_open for key, receiver in receivers.items()}
+            journal.close()
+
+            recovered = {key: QuietGarageReceiver() for key in range(garages)}
+            start = time.perf_counter()
+            journal = MmapJournal(path)
+            CommandHistory.recover(recovered, journal, every)
+            recovery = time.perf_counter() - start
+            journal.close()
+            assert {key: r.is_open for key, r in recovered.items()} == expected
+            rows.append(f'snapshot every {every}: {commands / elapsed:,.0f} commands/s, '
+                        f'{undos} undos in {undo_elapsed:.2f}s, journal {size / 1e6:.1f} MB, '
+                        f'recovery {recovery:.3f}s')
+    print('\n'.join(rows))
+
+
+def benchmark_coalescing(receivers=200, bursts=20, burst_length=8, flush_interval=0.005):
+    """Receiver calls and submit-to-done latency for bursty traffic, with and without coalescing."""
+
+    class CountingGarageReceiver(QuietGarageReceiver):
+        calls = 0
+
+        def open_door(self):
+            CountingGarageReceiver.calls += 1
+            super().open_door()
+
+        def close_door(self):
+            CountingGarageReceiver.calls += 1
+            super().close_door()
+
+    rng = random.Random(0)
+    workload = [[rng.choice((GarageOpenCommand, GarageCloseCommand)) for _ in range(burst_length)]
+                for _ in range(bursts)]
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        # door state after each burst when every command runs as submitted
+        reference = QuietGarageReceiver()
+        expected = []
+        for burst in workload:
+            for command_class in burst:
+                command_class(reference).execute()
+            expected.append(reference.is_open)
+
+        rows = []
+        for label, rules in (('direct', None), ('merge', [MergeSameType()]),
+                             ('last-write-wins+merge', [LastWriteWins(), MergeSameType()])):
+            CountingGarageReceiver.calls = 0
+            garages = [CountingGarageReceiver() for _ in range(receivers)]
+            invoker = QueuedInvoker(8)
+            coalescer = CoalescingInvoker(invoker, rules, flush_interval) if rules is not None else None
+            latencies = []
+            for burst, expected_open in zip(workload, expected):
+                submitted = []
+                for garage in garages:
+                    for command_class in burst:
+                        command = command_class(garage)
+                        target = coalescer or invoker
+                        submitted.append((time.perf_counter(), target.submit(command)))
+                for started, future in submitted:
+                    future.result()
+                    latencies.append(time.perf_counter() - started)
+                # coalescing must not change the outcome, only the number of calls
+                assert all(garage.is_open == expected_open for garage in garages), label
+            if coalescer is not None:
+                coalescer.close()
+            invoker.shutdown()
+            latencies.sort()
+            rows.append(f'{label:>21}: {CountingGarageReceiver.calls:,} receiver calls for '
+                        f'{len(latencies):,} commands, mean latency {sum(latencies) / len(latencies) * 1e3:.2f}ms, '
+                        f'p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.2f}ms')
+    print('\n'.join(rows))
@@ -13,7 +13,11 @@ because it’s coupled to the dog’s text field. You can use either all
 the classes involved in rendering the profile form, or none at all.
 """
 
+import time
+import weakref
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from fnmatch import fnmatchcase
 
 
 class Mediator(ABC):
@@ -72,17 +76,88 @@ class ComponentForm(Component):
 
 
 class ConcreteMediator(Mediator):
+    """
+    Delivers a sender's event only to the components subscribed to it.
+
+    Subscriptions are exact event names or fnmatch-style patterns such as
+    'order.*'. Exact names are looked up in a dict; the patterns matching
+    an event name are worked out once and kept in an LRU cache of
+    `MATCH_CACHE_SIZE` event names. Components are held by
+    weak reference, so a component that is garbage collected drops out of
+    the index by itself.
+    """
+
+    ALL = '*'
+    MATCH_CACHE_SIZE = 4096
+
     def __init__(self) -> None:
-        self._components = []
+        # event name or pattern -> {id(component): weak reference}
+        self._exact: dict[str, dict[int, weakref.ref]] = {}
+        self._patterns: dict[str, dict[int, weakref.ref]] = {}
+        # event name -> patterns matching it, least recently used first
+        self._matches: OrderedDict[str, list[str]] = OrderedDict()
 
     def register(self, component: Component) -> None:
-        self._components.append(component)
+        """Subscribe `component` to every event, like a plain broadcast."""
+        self.subscribe(component, self.ALL)
+
+    def subscribe(self, component: Component, pattern: str) -> None:
+        is_pattern = any(c in pattern for c in '*?[')
+        table = self._patterns if is_pattern else self._exact
+        if is_pattern and pattern not in self._patterns:
+            self._matches.clear()
+        key = id(component)
+        table.setdefault(pattern, {})[key] = weakref.ref(
+            component, lambda _: self._discard(table, pattern, key)
+        )
+
+    def unregister(self, component: Component, pattern: str | None = None) -> None:
+        """Remove one subscription of `component`, or all of them."""
+        key = id(component)
+        for table in (self._exact, self._patterns):
+            for subscribed in [p for p in table if pattern is None or p == pattern]:
+                if key in table[subscribed]:
+                    self._discard(table, subscribed, key)
 
     def notify(self, sender: object) -> None:
-        for component in self._components:
+        for component in self.subscribers(sender.event):
             if component is not sender:
                 component.receive()
 
+    def subscribers(self, event: str) -> list[Component]:
+        """Live components subscribed to `event`, each once, in subscription order."""
+        patterns = self._matching_patterns(event)
+        found = {}
+        for refs in [self._exact.get(event, {})] + [self._patterns[p] for p in patterns]:
+            for key, ref in list(refs.items()):
+                component = ref()
+                if component is not None:
+                    found.setdefault(key, component)
+        return list(found.values())
+
+    def _matching_patterns(self, event: str) -> list[str]:
+        if not self._patterns:
+            return []
+        patterns = self._matches.get(event)
+        if patterns is not None:
+            self._matches.move_to_end(event)
+            return patterns
+        patterns = [p for p in self._patterns if fnmatchcase(event, p)]
+        if len(self._matches) >= self.MATCH_CACHE_SIZE:
+            self._matches.popitem(last=False)
+        self._matches[event] = patterns
+        return patterns
+
+    def _discard(self, table: dict, pattern: str, key: int) -> None:
+        refs = table.get(pattern)
+        if refs is None:
+            return
+        refs.pop(key, None)
+        if not refs:
+            del table[pattern]
+            if table is self._patterns:
+                self._matches.clear()
+
 
 def test():
     mediator = ConcreteMediator()
@@ -96,4 +171,45 @@ def test():
     form.send()
 
 
+def benchmark(components: int = 100_000, topics: int = 10_000, notifications: int = 20_000):
+    """Notifications/sec with sparse subscriptions against a full O(N) broadcast loop."""
+
+    class CountingComponent(Component):
+        received = 0
+
+        def __init__(self, mediator: Mediator, event: str) -> None:
+            super().__init__(mediator, event)
+
+        def send(self):
+            self.mediator.notify(self)
+
+        def receive(self):
+            CountingComponent.received += 1
+
+    mediator = ConcreteMediator()
+    population = [CountingComponent(mediator, f'topic.{i % topics}') for i in range(components)]
+    for component in population:
+        mediator.subscribe(component, component.event)
+    # a few components watching a whole family of topics
+    for component in population[:10]:
+        mediator.subscribe(component, 'topic.1*')
+
+    start = time.perf_counter()
+    for i in range(notifications):
+        population[i % components].send()
+    elapsed = time.perf_counter() - start
+    print(f'indexed: {notifications / elapsed:,.0f} notifications/s, '
+          f'{CountingComponent.received / elapsed:,.0f} deliveries/s')
+
+    broadcast = 100
+    start = time.perf_counter()
+    for i in range(broadcast):
+        sender = population[i]
+        for component in population:
+            if component is not sender and component.event == sender.event:
+                component.receive()
+    elapsed = time.perf_counter() - start
+    print(f'broadcast loop: {broadcast / elapsed:,.0f} notifications/s')
+
+
 test()
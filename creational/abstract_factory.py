@@ -1,3 +1,4 @@
+import importlib
 from abc import abstractmethod, ABC
 
 """
@@ -33,6 +34,9 @@ class AsyncSqlDb(ABC):
     async def connect(self):
         ...
 
+    async def close(self):
+        ...
+
 
 class Postgres(SqlDb):
     """ CONCRETE PRODUCT """
@@ -92,3 +96,78 @@ class FactoryAsyncDb(Factory):
 
     def create_mysql(self):
         return AsyncMySql()
+
+
+class FactoryRegistry:
+    """
+    Product families by name, resolved on first use.
+
+    A family is declared with a dotted path ('package.module:FactoryClass'),
+    so its module is only imported when the family is first requested, or
+    registered directly with a Factory class or instance. Resolved factories
+    are memoized.
+    """
+
+    def __init__(self) -> None:
+        self._declared: dict[str, str | type[Factory] | Factory] = {}
+        self._resolved: dict[str, Factory] = {}
+
+    def declare(self, name: str, path: str) -> None:
+        if ':' not in path:
+            raise ValueError(f'Expected "module:attribute", got {path!r}')
+        self._declared[name] = path
+        self._resolved.pop(name, None)
+
+    def register(self, name: str, factory: type[Factory] | Factory) -> None:
+        self._declared[name] = factory
+        self._resolved.pop(name, None)
+
+    def get(self, name: str) -> Factory:
+        try:
+            return self._resolved[name]
+        except KeyError:
+            pass
+        target = self._declared[name]
+        if isinstance(target, str):
+            module, _, attribute = target.partition(':')
+            target = getattr(importlib.import_module(module), attribute)
+        factory = target() if isinstance(target, type) else target
+        self._resolved[name] = factory
+        return factory
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._declared
+
+
+factories = FactoryRegistry()
+factories.declare('sync', f'{__name__}:FactoryDb')
+factories.declare('async', f'{__name__}:FactoryAsyncDb')
+
+
+def benchmark_startup(runs: int = 5):
+    """ Cold import time and time to the first and second create_postgres(), each in a fresh interpreter. """
+    # imported here so they do not count towards this module's own import time
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    root = Path(__file__).resolve().parents[__name__.count('.')]
+    code = (
+        'import time\n'
+        't0 = time.perf_counter()\n'
+        f'import {__name__} as m\n'
+        't1 = time.perf_counter()\n'
+        'm.factories.get("sync").create_postgres()\n'
+        't2 = time.perf_counter()\n'
+        'm.factories.get("sync").create_postgres()\n'
+        't3 = time.perf_counter()\n'
+        'print(t1 - t0, t2 - t1, t3 - t2)\n'
+    )
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', code], cwd=root, check=True,
+                             capture_output=True, text=True).stdout
+        samples.append([float(x) for x in out.split()])
+    for i, label in enumerate(('import', 'first create_postgres', 'memoized create_postgres')):
+        best = min(sample[i] for sample in samples)
+        print(f'{label:>25}: {best * 1e3:.3f}ms')
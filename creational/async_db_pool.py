@@ -0,0 +1,217 @@
+"""
+asyncio connection pool for the AsyncSqlDb products of the abstract factory,
+plus an in-process fake database server to measure it against.
+
+Kept apart from abstract_factory so importing the factories does not pay
+for importing asyncio.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from creational.abstract_factory import AsyncSqlDb, Factory
+
+
+class AsyncDbPool:
+    """
+    Bounded asyncio pool of AsyncSqlDb products.
+
+    `create` is a factory method such as `FactoryAsyncDb().create_postgres`.
+    At most `max_size` connections are checked out at once, `start()` warms
+    up `min_size` of them, and connections idle for longer than
+    `idle_timeout` seconds are closed instead of being reused. A connection
+    whose user raised or was cancelled inside `connection()` may be left
+    mid-query, so it is closed rather than returned to the pool.
+    """
+
+    def __init__(self, create, max_size: int = 10, min_size: int = 0,
+                 idle_timeout: float | None = None) -> None:
+        if not 0 <= min_size <= max_size:
+            raise ValueError('expected 0 <= min_size <= max_size')
+        self._create = create
+        self._min_size = min_size
+        self._idle_timeout = idle_timeout
+        self._slots = asyncio.Semaphore(max_size)
+        # (connection, released_at) pairs, most recently released on the right
+        self._idle: deque[tuple[AsyncSqlDb, float]] = deque()
+        # closes running in the background, kept so they are not garbage collected
+        self._closing: set[asyncio.Task] = set()
+        self._closed = False
+
+    async def start(self) -> 'AsyncDbPool':
+        connections = await asyncio.gather(*(self._open() for _ in range(self._min_size)))
+        now = time.monotonic()
+        self._idle.extend((db, now) for db in connections)
+        return self
+
+    async def acquire(self) -> AsyncSqlDb:
+        if self._closed:
+            raise RuntimeError('Connection pool is closed')
+        await self._slots.acquire()
+        try:
+            await self._evict_idle()
+            if self._idle:
+                return self._idle.pop()[0]
+            return await self._open()
+        except BaseException:
+            # also covers cancellation while connecting: give the slot back
+            self._slots.release()
+            raise
+
+    def release(self, db: AsyncSqlDb, discard: bool = False) -> None:
+        """
+        Synchronous so that a cancelled caller cannot leak its slot. With
+        `discard=True` the connection is closed instead of reused.
+        """
+        if discard or self._closed:
+            task = asyncio.ensure_future(self._close_quietly(db))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        else:
+            self._idle.append((db, time.monotonic()))
+        self._slots.release()
+
+    @asynccontextmanager
+    async def connection(self):
+        db = await self.acquire()
+        try:
+            yield db
+        except BaseException:
+            self.release(db, discard=True)
+            raise
+        self.release(db)
+
+    async def close(self) -> None:
+        self._closed = True
+        idle, self._idle = self._idle, deque()
+        await asyncio.gather(*(db.close() for db, _ in idle), *self._closing)
+
+    @staticmethod
+    async def _close_quietly(db: AsyncSqlDb) -> None:
+        # the connection is being thrown away; a failure to close it changes nothing
+        try:
+            await db.close()
+        except Exception:
+            pass
+
+    async def _open(self) -> AsyncSqlDb:
+        db = self._create()
+        await db.connect()
+        return db
+
+    async def _evict_idle(self) -> None:
+        if self._idle_timeout is None:
+            return
+        cutoff = time.monotonic() - self._idle_timeout
+        expired = []
+        while self._idle and self._idle[0][1] < cutoff:
+            expired.append(self._idle.popleft()[0])
+        await asyncio.gather(*(db.close() for db in expired))
+
+
+class FakeDbServer:
+    """ In-process TCP server that answers after `connect_latency` seconds, as a stand-in database. """
+
+    def __init__(self, connect_latency: float = 0.0) -> None:
+        self.connect_latency = connect_latency
+        self.connections = 0
+        self._server = None
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def start(self) -> 'FakeDbServer':
+        self._server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        return self
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        await asyncio.sleep(self.connect_latency)
+        writer.write(b'READY\n')
+        try:
+            while line := await reader.readline():
+                writer.write(b'OK ' + line)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+class FakeAsyncDb(AsyncSqlDb):
+    """ CONCRETE PRODUCT talking to a FakeDbServer """
+
+    def __init__(self, name: str, host: str, port: int) -> None:
+        self.name = name
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        await self._reader.readline()
+        return self.name
+
+    async def execute(self, query: str) -> str:
+        self._writer.write(query.encode() + b'\n')
+        await self._writer.drain()
+        return (await self._reader.readline()).decode().rstrip()
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+            self._writer = None
+
+
+class FactoryFakeAsyncDb(Factory):
+    """ CONCRETE FACTORY for local testing against a FakeDbServer """
+
+    def __init__(self, server: FakeDbServer) -> None:
+        self._server = server
+
+    def create_postgres(self):
+        return FakeAsyncDb('async Postgres', *self._server.address)
+
+    def create_mysql(self):
+        return FakeAsyncDb('async Mysql', *self._server.address)
+
+
+async def benchmark(requests: int = 2000, concurrency: int = 50, connect_latency: float = 0.002):
+    """ Requests/sec with one connect per request versus an AsyncDbPool. """
+    server = await FakeDbServer(connect_latency).start()
+    factory = FactoryFakeAsyncDb(server)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def unpooled():
+        async with limit:
+            db = factory.create_postgres()
+            await db.connect()
+            try:
+                await db.execute('SELECT 1')
+            finally:
+                await db.close()
+
+    pool = await AsyncDbPool(factory.create_postgres, max_size=concurrency,
+                             min_size=concurrency).start()
+
+    async def pooled():
+        async with pool.connection() as db:
+            await db.execute('SELECT 1')
+
+    for label, request in (('unpooled', unpooled), ('pooled', pooled)):
+        server.connections = 0
+        start = time.perf_counter()
+        await asyncio.gather(*(request() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        print(f'{label:>8}: {requests / elapsed:,.0f} req/s, {server.connections} connects')
+
+    await pool.close()
+    await server.stop()
@@ -1,4 +1,9 @@
+import sqlite3
+import time
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+from itertools import islice
 
 """
 What is the Builder Design Pattern?
@@ -21,56 +26,160 @@ the same construction process.
 class SqlQuery:
     """ Product"""
 
-    def __init__(self, query) -> None:
+    def __init__(self, query, params=()) -> None:
         self.query = query
+        self.params = tuple(params)
+
+    def __repr__(self) -> str:
+        return f'SqlQuery({self.query!r}, {self.params!r})'
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SqlQuery):
+            return NotImplemented
+        return (self.query, self.params) == (other.query, other.params)
 
 
 class SqlBuilder(ABC):
-    """ Abstract Builder """
+    """
+    Abstract Builder
 
-    @abstractmethod
-    def select(self):
-        ...
+    The steps only record the statement; `build()` renders it. The SQL text
+    depends only on the statement shape (columns, table and filtered column
+    names), so with `cache=True` it is rendered once per shape and reused
+    for every build that differs only in parameter values.
+    """
+
+    # most bind parameters the server accepts in one statement
+    max_params = 65535
+
+    def __init__(self, cache: bool = True) -> None:
+        self._cache = cache
+        self._reset()
+
+    def _reset(self) -> None:
+        self._columns: tuple[str, ...] = ('*',)
+        self._table: str | None = None
+        self._where: list[tuple[str, object]] = []
 
+    @staticmethod
     @abstractmethod
-    def from_(self):
+    def quote(identifier: str) -> str:
         ...
 
+    @staticmethod
     @abstractmethod
-    def where(self):
+    def placeholder(index: int) -> str:
+        """ Bind parameter marker for the 1-based parameter `index`. """
         ...
 
-
-class PostgresBuilder(SqlBuilder):
-    """ Concrete Builder """
-
-    def select(self):
-        print(SqlQuery("select postgres"))
+    def select(self, *columns: str):
+        self._columns = columns or ('*',)
         return self
 
-    def from_(self):
-        print(SqlQuery("from"))
+    def from_(self, table: str):
+        self._table = table
         return self
 
-    def where(self):
-        print(SqlQuery("where"))
+    def where(self, **conditions):
+        self._where.extend(conditions.items())
         return self
 
+    def build(self) -> SqlQuery:
+        if self._table is None:
+            raise ValueError('from_() must be called before build()')
+        render = _render_cached if self._cache else _render
+        text = render(type(self), self._columns, self._table, tuple(column for column, _ in self._where))
+        query = SqlQuery(text, (value for _, value in self._where))
+        self._reset()
+        return query
+
+    def insert_many(self, table: str, columns: tuple[str, ...], rows: Iterable[tuple],
+                    max_params: int | None = None) -> Iterator[SqlQuery]:
+        """
+        Yield multi-row INSERT statements for `rows`, each with at most
+        `max_params` bind parameters. Rows are consumed lazily, one chunk at
+        a time, so memory stays flat however long `rows` is.
+        """
+        if not columns:
+            raise ValueError('insert_many() needs at least one column')
+        limit = self.max_params if max_params is None else max_params
+        rows_per_chunk = limit // len(columns)
+        if rows_per_chunk < 1:
+            raise ValueError(f'{len(columns)} columns exceed the limit of {limit} parameters')
+        columns = tuple(columns)
+        width = len(columns)
+        render = _render_insert_cached if self._cache else _render_insert
+        rows = iter(rows)
+        while chunk := list(islice(rows, rows_per_chunk)):
+            if any(len(row) != width for row in chunk):
+                raise ValueError(f'every row must have {width} values')
+            params = [value for row in chunk for value in row]
+            yield SqlQuery(render(type(self), table, columns, len(chunk)), params)
+
+
+def _render(builder: type[SqlBuilder], columns: tuple[str, ...], table: str,
+            where: tuple[str, ...]) -> str:
+    quote = builder.quote
+    text = f'SELECT {", ".join("*" if c == "*" else quote(c) for c in columns)} FROM {quote(table)}'
+    if where:
+        text += ' WHERE ' + ' AND '.join(
+            f'{quote(column)} = {builder.placeholder(i)}' for i, column in enumerate(where, 1)
+        )
+    return text
+
+
+_render_cached = lru_cache(maxsize=1024)(_render)
+
+
+def _render_insert(builder: type[SqlBuilder], table: str, columns: tuple[str, ...], rows: int) -> str:
+    quote = builder.quote
+    width = len(columns)
+    values = ', '.join(
+        '(' + ', '.join(builder.placeholder(row * width + i) for i in range(1, width + 1)) + ')'
+        for row in range(rows)
+    )
+    return f'INSERT INTO {quote(table)} ({", ".join(quote(c) for c in columns)}) VALUES {values}'
+
+
+_render_insert_cached = lru_cache(maxsize=256)(_render_insert)
+
+
+class PostgresBuilder(SqlBuilder):
+    """ Concrete Builder """
+
+    @staticmethod
+    def quote(identifier: str) -> str:
+        return '"' + identifier.replace('"', '""') + '"'
+
+    @staticmethod
+    def placeholder(index: int) -> str:
+        return f'${index}'
+
 
 class MySqlBuilder(SqlBuilder):
     """ Concrete Builder """
 
-    def select(self):
-        print(SqlQuery("select mysql"))
-        return self
+    @staticmethod
+    def quote(identifier: str) -> str:
+        return '`' + identifier.replace('`', '``') + '`'
 
-    def from_(self):
-        print(SqlQuery("from"))
-        return self
+    @staticmethod
+    def placeholder(index: int) -> str:
+        return '%s'
 
-    def where(self):
-        print(SqlQuery("where"))
-        return self
+
+class SqliteBuilder(SqlBuilder):
+    """ Concrete Builder, used as a local stand-in database """
+
+    max_params = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+    @staticmethod
+    def quote(identifier: str) -> str:
+        return '"' + identifier.replace('"', '""') + '"'
+
+    @staticmethod
+    def placeholder(index: int) -> str:
+        return '?'
 
 
 class SqlDirector:
@@ -79,15 +188,50 @@ class SqlDirector:
     def __init__(self, builder) -> None:
         self.builder = builder
 
-    def construct(self):
-        return self.builder.select().from_().where()
+    def construct(self, table: str, columns: tuple[str, ...] = (), **conditions) -> SqlQuery:
+        return self.builder.select(*columns).from_(table).where(**conditions).build()
 
 
 def test():
     postgres_builder = PostgresBuilder()
     postgres_director = SqlDirector(postgres_builder)
-    postgres_director.construct()
+    print(postgres_director.construct('users', ('id', 'name'), id=1))
 
     mysql_builder = MySqlBuilder()
     mysql_director = SqlDirector(mysql_builder)
-    mysql_director.construct()
+    print(mysql_director.construct('users', ('id', 'name'), id=1))
+
+
+def benchmark(builds: int = 200_000):
+    """ Director builds/sec with and without the statement-shape cache. """
+    for cache in (False, True):
+        director = SqlDirector(PostgresBuilder(cache=cache))
+        start = time.perf_counter()
+        for i in range(builds):
+            director.construct('users', ('id', 'name', 'email'), id=i, active=True)
+        elapsed = time.perf_counter() - start
+        print(f'cache={cache!s:>5}: {builds / elapsed:,.0f} builds/s')
+
+
+def benchmark_insert(rows: int = 100_000):
+    """ Rows/sec into an in-memory sqlite3 database: one statement per row vs insert_many(). """
+    columns = ('id', 'name', 'email', 'score')
+
+    def generate():
+        return ((i, f'user{i}', f'user{i}@example.com', i * 0.5) for i in range(rows))
+
+    builder = SqliteBuilder()
+    for label, statements in (
+        ('per row', lambda: (q for row in generate() for q in builder.insert_many('users', columns, [row]))),
+        ('batched', lambda: builder.insert_many('users', columns, generate())),
+    ):
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE TABLE users (id INTEGER, name TEXT, email TEXT, score REAL)')
+        start = time.perf_counter()
+        for query in statements():
+            conn.execute(query.query, query.params)
+        conn.commit()
+        elapsed = time.perf_counter() - start
+        count = conn.execute('SELECT count(*) FROM users').fetchone()[0]
+        conn.close()
+        print(f'{label}: {count / elapsed:,.0f} rows/s')
@@ -1,44 +1,152 @@
+import json
+import os
+import re
+import tempfile
+import time
+import tracemalloc
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+from xml.sax.saxutils import escape, quoteattr
 
 
 class Encoder(ABC):
     """ ABSTRACT CREATOR """
 
+    # document framing used by the streaming API
+    header = ''
+    separator = ''
+    footer = ''
+    # stateless encoders are created once and shared by create_encoder
+    stateless = True
+    # set when encode(txt) is exactly prefix + str(txt), so encode_many can join directly
+    prefix: str | None = None
+
     @abstractmethod
     def encode(self, txt: str):
         ...
 
+    def encode_many(self, txts: Iterable[str], sep: str = '\n') -> str:
+        """ Encode every item and join the results with `sep` in a single pass. """
+        if self.prefix is None:
+            return sep.join(map(self.encode, txts))
+        # one join sizes and fills the result buffer, no per-item string is built
+        txts = list(map(str, txts))
+        return self.prefix + f'{sep}{self.prefix}'.join(txts) if txts else ''
+
     @abstractmethod
-    def create_file(self):
+    def encode_record(self, record) -> str:
         ...
 
+    def iter_encode(self, records: Iterable, buffer_size: int = 64 * 1024) -> Iterator[str]:
+        """
+        Yield the encoded document in chunks of roughly `buffer_size`
+        characters, encoding records as they are pulled from `records`.
+        """
+        parts = [self.header]
+        buffered = len(self.header)
+        separator = ''
+        for record in records:
+            part = separator + self.encode_record(record)
+            separator = self.separator
+            parts.append(part)
+            buffered += len(part)
+            if buffered >= buffer_size:
+                yield ''.join(parts)
+                parts.clear()
+                buffered = 0
+        parts.append(self.footer)
+        yield ''.join(parts)
+
+    def write(self, records: Iterable, fp, buffer_size: int = 64 * 1024) -> int:
+        """ Stream the encoded document into the writable text object `fp`. Returns characters written. """
+        written = 0
+        for chunk in self.iter_encode(records, buffer_size):
+            fp.write(chunk)
+            written += len(chunk)
+        return written
+
+    def create_file(self, path: str, records: Iterable = ()) -> int:
+        with open(path, 'w', encoding='utf-8') as fp:
+            return self.write(records, fp)
+
 
 class JsonEncoder(Encoder):
     """ CONCRETE CREATOR """
 
+    header = '['
+    separator = ','
+    footer = ']'
+    prefix = 'JSON '
+
     def encode(self, txt: str):
-        return f'JSON {txt}'
+        return f'{self.prefix}{txt}'
 
-    def create_file(self):
-        return 'JSON file created'
+    def encode_record(self, record) -> str:
+        return json.dumps(record)
 
 
 class XmlEncoder(Encoder):
-    """ CONCRETE CREATOR """
+    """
+    CONCRETE CREATOR
+
+    Dict keys that are plain XML names become element names; any other
+    key is written as <field name="...">, so every document stays well-formed.
+    """
+
+    header = '<records>'
+    footer = '</records>'
+    prefix = 'XML '
 
     def encode(self, txt: str):
-        return f'XML {txt}'
+        return f'{self.prefix}{txt}'
+
+    def encode_record(self, record) -> str:
+        if isinstance(record, dict):
+            fields = ''.join(
+                f'{tags[0]}{escape(str(value))}{tags[1]}'
+                for tags, value in zip(map(_xml_tags, record), record.values())
+            )
+            return f'<record>{fields}</record>'
+        return f'<record>{escape(str(record))}</record>'
+
+
+# ASCII-only and without ':' or the reserved 'xml' prefix, to stay clear of namespaces
+_XML_NAME = re.compile(r'(?!xml)[A-Za-z_][A-Za-z0-9_.-]*', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def _xml_tags(key) -> tuple[str, str]:
+    """ Opening and closing tag for a record field. """
+    name = str(key)
+    if _XML_NAME.fullmatch(name):
+        return f'<{name}>', f'</{name}>'
+    return f'<field name={quoteattr(name)}>', '</field>'
+
+
+_encoders: dict[str, type[Encoder]] = {
+    'JSON': JsonEncoder,
+    'XML': XmlEncoder
+}
+_instances: dict[str, Encoder] = {}
+
 
-    def create_file(self):
-        return 'XML file created'
+def register_encoder(name: str, encoder: type[Encoder]) -> None:
+    """ Add or replace an encoder format at runtime. """
+    _encoders[name] = encoder
+    _instances.pop(name, None)
 
 
 def create_encoder(encoder: str):
-    _encoders = {
-        'JSON': JsonEncoder,
-        'XML': XmlEncoder
-    }
-    return _encoders[encoder]()
+    try:
+        return _instances[encoder]
+    except KeyError:
+        pass
+    cls = _encoders[encoder]
+    instance = cls()
+    if cls.stateless:
+        _instances[encoder] = instance
+    return instance
 
 
 def test():
@@ -48,5 +156,46 @@ def test():
     for txt in _txts:
         _json_encoder.encode(txt)
         _xml_encoder.encode(txt)
-        _json_encoder.create_file()
-        _xml_encoder.create_file()
+    with tempfile.TemporaryDirectory() as tmp:
+        _json_encoder.create_file(os.path.join(tmp, 'out.json'), _txts)
+        _xml_encoder.create_file(os.path.join(tmp, 'out.xml'), _txts)
+
+
+def benchmark_many(items: int = 1_000_000):
+    """ Throughput of encode_many() against the per-item loop that test() uses. """
+    txts = [f'record {i}' for i in range(items)]
+    for fmt in ('JSON', 'XML'):
+        encoder = create_encoder(fmt)
+        start = time.perf_counter()
+        out = []
+        for txt in txts:
+            out.append(encoder.encode(txt))
+        loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        encoder.encode_many(txts)
+        many = time.perf_counter() - start
+        print(f'{fmt:>4}: loop {items / loop:,.0f} items/s, encode_many {items / many:,.0f} items/s')
+
+
+def benchmark(records: int = 1_000_000):
+    """ MB/s and peak traced memory when streaming `records` records to disk. """
+
+    def generate():
+        return ({'id': i, 'name': f'user{i}', 'score': i * 0.5} for i in range(records))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ('JSON', 'XML'):
+            encoder = create_encoder(fmt)
+            path = os.path.join(tmp, f'out.{fmt.lower()}')
+            start = time.perf_counter()
+            encoder.create_file(path, generate())
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(path)
+
+            tracemalloc.start()
+            encoder.create_file(path, generate())
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f'{fmt:>4}: {size / 1e6 / elapsed:.1f} MB/s, '
+                  f'{size / 1e6:.1f} MB file, peak {peak / 1e6:.2f} MB')
@@ -13,13 +13,108 @@ known as prototypes. These prototypes serve as templates, allowing
 us to replicate their structure and attributes. When a new object is needed,
 we clone the prototype, saving both time and resources.
 """
+import copy
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 
 
 class Prototype:
-    """ The Prototype interface. """
+    """
+    The Prototype interface.
 
-    def clone(self):
-        return copy.deepcopy(self)
+    `clone_mode` picks how clones are made:
+      'deep'    - copy.deepcopy of the whole object
+      'shallow' - new object sharing every attribute value
+      'fields'  - shallow, except the attributes named in `deep_fields` are deep-copied
+      'cow'     - copy-on-write: the clone keeps a shallow snapshot of the
+                  prototype's attributes and reads from it until its first
+                  attribute assignment or deletion, which deep-copies the
+                  snapshot into the clone. Rebinding an attribute of the
+                  prototype later does not affect the clone, but until that
+                  first write the attribute values themselves are shared, so
+                  in-place mutation on either side shows through.
+    """
+
+    clone_mode = 'deep'
+    deep_fields: tuple[str, ...] = ()
+
+    def clone(self, mode: str | None = None):
+        return _CLONERS[mode or self.clone_mode](self)
+
+    def __getattr__(self, name):
+        # only reached when normal lookup fails, e.g. on an unwritten cow clone
+        state = self.__dict__.get('_cow_state')
+        if state is None or name not in state:
+            raise AttributeError(f'{type(self).__name__!r} object has no attribute {name!r}')
+        return state[name]
+
+    def __setattr__(self, name, value):
+        if '_cow_state' in self.__dict__:
+            self._materialize()
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        if '_cow_state' in self.__dict__:
+            self._materialize()
+        super().__delattr__(name)
+
+    def _materialize(self) -> None:
+        self.__dict__.update(copy.deepcopy(self.__dict__.pop('_cow_state')))
+
+
+def _clone_shallow(obj: Prototype) -> Prototype:
+    clone = object.__new__(type(obj))
+    clone.__dict__.update(obj.__dict__)
+    return clone
+
+
+def _clone_fields(obj: Prototype) -> Prototype:
+    clone = _clone_shallow(obj)
+    state = clone.__dict__
+    for field in obj.deep_fields:
+        if field in state:
+            state[field] = copy.deepcopy(state[field])
+    return clone
+
+
+def _clone_cow(obj: Prototype) -> Prototype:
+    clone = object.__new__(type(obj))
+    # snapshots are never written to, so an unwritten cow clone's one can be shared
+    state = obj.__dict__.get('_cow_state')
+    clone.__dict__['_cow_state'] = dict(obj.__dict__) if state is None else state
+    return clone
+
+
+_CLONERS = {
+    'deep': copy.deepcopy,
+    'shallow': _clone_shallow,
+    'fields': _clone_fields,
+    'cow': _clone_cow,
+}
+
+
+class PrototypeRegistry:
+    """ Named prototypes that hand out clones. """
+
+    def __init__(self) -> None:
+        self._prototypes: dict[str, tuple[Prototype, str | None]] = {}
+
+    def register(self, name: str, prototype: Prototype, mode: str | None = None) -> None:
+        if mode is not None and mode not in _CLONERS:
+            raise ValueError(f'Unknown clone mode: {mode}')
+        self._prototypes[name] = (prototype, mode)
+
+    def unregister(self, name: str) -> None:
+        del self._prototypes[name]
+
+    def clone(self, name: str, **attrs) -> Prototype:
+        prototype, mode = self._prototypes[name]
+        clone = prototype.clone(mode)
+        for attr, value in attrs.items():
+            setattr(clone, attr, value)
+        return clone
 
 
 class DbConnection(Prototype):
@@ -34,5 +129,185 @@ class DbConnection(Prototype):
         self.connection = f'{self.name}://{self.host}:{self.port}'
         return self.connection
 
-    def create_connection_pool(self, pool_size: int):
-        return [self.clone() for _ in range(pool_size)]
+    def close(self):
+        self.connection = None
+
+    def is_alive(self) -> bool:
+        return self.connection is not None
+
+    def create_connection_pool(self, pool_size: int, **kwargs):
+        return ConnectionPool(self, max_size=pool_size, **kwargs)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of connections cloned from a DbConnection prototype.
+
+    Connections are cloned and connected lazily, only when no idle one
+    is available and the pool is below `max_size`. When the pool is
+    exhausted, `acquire` waits up to `timeout` seconds for a release.
+    A connection whose user raised inside `connection()` is closed
+    rather than returned to the pool.
+    """
+
+    def __init__(self, prototype: DbConnection, max_size: int,
+                 idle_timeout: float | None = None, health_check=None):
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+        self._prototype = prototype
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._health_check = health_check or DbConnection.is_alive
+        # (connection, released_at) pairs, most recently released on the right
+        self._idle: deque[tuple[DbConnection, float]] = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def acquire(self, timeout: float | None = None) -> DbConnection:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            conn = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError('Connection pool is closed')
+                    self._evict_idle()
+                    if self._idle:
+                        conn, _ = self._idle.pop()
+                        break
+                    if self._size < self._max_size:
+                        self._size += 1
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f'No connection available within {timeout}s')
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                return self._open()
+            if self._health_check(conn):
+                return conn
+            self._discard(conn)
+
+    def release(self, conn: DbConnection, discard: bool = False) -> None:
+        """ With `discard=True` the connection is closed instead of reused. """
+        if discard:
+            self._discard(conn)
+            return
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                conn.close()
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: float | None = None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except BaseException:
+            # the connection may be left mid-query; never hand it to the next caller
+            self.release(conn, discard=True)
+            raise
+        self.release(conn)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                conn.close()
+                self._size -= 1
+            self._cond.notify_all()
+
+    def _open(self) -> DbConnection:
+        try:
+            conn = self._prototype.clone()
+            conn.connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def _discard(self, conn: DbConnection) -> None:
+        conn.close()
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _evict_idle(self) -> None:
+        """ Close connections idle for longer than `idle_timeout`. Caller holds the lock. """
+        if self._idle_timeout is None:
+            return
+        cutoff = time.monotonic() - self._idle_timeout
+        while self._idle and self._idle[0][1] < cutoff:
+            conn, _ = self._idle.popleft()
+            conn.close()
+            self._size -= 1
+
+
+def benchmark_clone(clones: int = 20_000):
+    """ Time per clone of a realistically sized DbConnection in each clone mode. """
+    prototype = DbConnection('postgres', 'db.internal', 5432)
+    prototype.options = {f'option_{i}': {'value': i, 'tags': [str(i)] * 4} for i in range(50)}
+    prototype.search_path = [f'schema_{i}' for i in range(100)]
+    prototype.deep_fields = ('search_path',)
+
+    for mode in _CLONERS:
+        start = time.perf_counter()
+        for _ in range(clones):
+            prototype.clone(mode)
+        elapsed = time.perf_counter() - start
+        print(f'{mode:>8}: {elapsed / clones * 1e6:8.2f}us/clone')
+
+    start = time.perf_counter()
+    for _ in range(clones):
+        prototype.clone('cow').port = 5433
+    elapsed = time.perf_counter() - start
+    print(f'{"cow+write":>8}: {elapsed / clones * 1e6:8.2f}us/clone')
+
+
+def benchmark(threads: int = 32, pool_size: int = 8, iterations: int = 2000):
+    """ Acquire/release latency while `threads` workers contend for `pool_size` connections. """
+    pool = DbConnection('postgres', 'localhost', 5432).create_connection_pool(pool_size)
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            with pool.connection():
+                local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    total = len(latencies)
+    print(f'{total} checkouts by {threads} threads on {pool_size} connections '
+          f'in {elapsed:.3f}s ({total / elapsed:,.0f}/s)')
+    for q in (0.5, 0.95, 0.99):
+        print(f'  p{int(q * 100)}: {latencies[int(total * q) - 1] * 1e6:.1f}us')
+    print(f'  connections opened: {pool.size}')
+    pool.close()
@@ -8,46 +8,270 @@ such as database connections, without creating multiple connections and overwhel
 Lazy Initialization: Allows for efficient resource usage by creating the
 instance only when it is actually needed.
 """
+import asyncio
+import os
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Objects whose `_after_fork()` runs in a forked child, so workers never
+# share sockets or other resources built by the parent process. Held
+# weakly, so registering does not keep scopes or providers alive.
+_fork_resets: weakref.WeakSet = weakref.WeakSet()
+
+
+def _reset_after_fork() -> None:
+    for obj in list(_fork_resets):
+        obj._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
 
 class Singleton:
+    """
+    Double-checked locking: the lock is only taken while the instance
+    does not exist yet, lookups after that are a plain attribute read.
+    """
     _instance = None
+    _lock = threading.Lock()
+    _classes = weakref.WeakSet()  # every subclass, so a fork can reset them all
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # do not inherit the parent's instance
+        cls._instance = None
+        cls._lock = threading.Lock()
+        Singleton._classes.add(cls)
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
         return cls._instance
 
+    @staticmethod
+    def _after_fork() -> None:
+        # a lock another thread held at fork time would stay held in the child
+        for cls in [Singleton, *Singleton._classes]:
+            cls._instance = None
+            cls._lock = threading.Lock()
+
+
+_fork_resets.add(Singleton)
+
 
 class SingletonMeta(type):
     _instances = {}
+    _classes = weakref.WeakSet()  # every class using the metaclass, so a fork can reset them all
+
+    def __init__(cls, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        cls._singleton_lock = threading.Lock()
+        SingletonMeta._classes.add(cls)
 
     def __call__(cls, *args, **kwargs):
         """
         Possible changes to the value of the `__init__` argument
         do not affect the returned instance.
         """
-        if cls not in cls._instances:
-            instance = super().__call__(*args, **kwargs)
-            cls._instances[cls] = instance
-        return cls._instances[cls]
+        try:
+            return SingletonMeta._instances[cls]
+        except KeyError:
+            pass
+        with cls._singleton_lock:
+            if cls not in SingletonMeta._instances:
+                SingletonMeta._instances[cls] = super().__call__(*args, **kwargs)
+            return SingletonMeta._instances[cls]
+
+    @staticmethod
+    def _after_fork() -> None:
+        # a lock another thread held at fork time would stay held in the child
+        for cls in list(SingletonMeta._classes):
+            cls._singleton_lock = threading.Lock()
+        SingletonMeta._instances.clear()
+
+
+_fork_resets.add(SingletonMeta)
 
 
 class SingletonClassViaMeta(metaclass=SingletonMeta):
     pass
 
 
-def singleton(cls):
-    instances = {}  # Dictionary to store instances of different classes
+class Scope(ABC):
+    """
+    Where scoped instances live. `storage()` returns the dict of
+    provider -> instance for the scope that is current for the caller.
+    """
+
+    @abstractmethod
+    def storage(self) -> dict:
+        ...
+
+    @staticmethod
+    def release(instances: dict) -> None:
+        """ Drop every instance of an ended scope, disposing of it first. """
+        while instances:
+            provider, instance = instances.popitem()
+            if isinstance(instance, weakref.ref):
+                instance = instance()
+            if instance is not None and provider.dispose is not None:
+                provider.dispose(instance)
+
+
+class ProcessScope(Scope):
+    """ Keyed weakly by provider, so a provider nobody uses any more is freed with its instance. """
+
+    def __init__(self) -> None:
+        self._instances = weakref.WeakKeyDictionary()
+        _fork_resets.add(self)
+
+    def storage(self) -> dict:
+        return self._instances
+
+    def _after_fork(self) -> None:
+        self._instances.clear()
+
+
+class ThreadScope(Scope):
+    """
+    Instances are released, and disposed of, when the thread's locals are
+    dropped as the thread exits. Threads still running at interpreter exit
+    are not disposed of. Keyed weakly by provider, like ProcessScope.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+
+    def storage(self) -> dict:
+        try:
+            return self._local.instances
+        except AttributeError:
+            instances = self._local.instances = weakref.WeakKeyDictionary()
+            # goes away with the thread's locals, which triggers the release
+            self._local.sentinel = sentinel = _ThreadEnd()
+            weakref.finalize(sentinel, Scope.release, instances).atexit = False
+            return instances
+
+
+class _ThreadEnd:
+    __slots__ = ('__weakref__',)
+
+
+class TaskScope(Scope):
+    """ One store per asyncio task, released when the task finishes. """
+
+    def __init__(self) -> None:
+        self._current: ContextVar[tuple | None] = ContextVar('task_scope', default=None)
+
+    def storage(self) -> dict:
+        task = asyncio.current_task()
+        if task is None:
+            raise RuntimeError('task scope used outside of an asyncio task')
+        current = self._current.get()
+        # a child task inherits its parent's context, so check the owner too
+        if current is not None and current[0] is task:
+            return current[1]
+        instances: dict = {}
+        self._current.set((task, instances))
+        task.add_done_callback(lambda _: self.release(instances))
+        return instances
+
+
+class RequestScope(Scope):
+    """ Explicit scope: instances live until the innermost `with scope():` block exits. """
 
-    def get_instance(*args, **kwargs):
-        # If class instance doesn't exist in the dictionary
-        if cls not in instances:
-            instances[cls] = cls(*args, **kwargs)
-        return instances[cls]  # Return the existing instance
+    def __init__(self) -> None:
+        self._current: ContextVar[dict | None] = ContextVar('request_scope', default=None)
 
-    # Return the closure function for class instantiation
-    return get_instance
+    def storage(self) -> dict:
+        instances = self._current.get()
+        if instances is None:
+            raise RuntimeError('request scope used outside of a request')
+        return instances
+
+    @contextmanager
+    def __call__(self):
+        instances: dict = {}
+        token = self._current.set(instances)
+        try:
+            yield
+        finally:
+            self._current.reset(token)
+            self.release(instances)
+
+
+scopes: dict[str, Scope] = {
+    'process': ProcessScope(),
+    'thread': ThreadScope(),
+    'task': TaskScope(),
+    'request': RequestScope(),
+}
+request_scope = scopes['request']
+
+
+class Scoped:
+    """
+    Class wrapper that hands out one instance of `cls` per scope.
+
+    Keeps `isinstance`/`issubclass` working against the wrapped class.
+    With `weak=True` the scope only holds a weak reference, so an instance
+    is reused while somebody else keeps it alive and rebuilt afterwards.
+    `dispose` is called with each instance when its scope ends.
+    """
+
+    def __init__(self, cls, scope: str = 'process', weak: bool = False, dispose=None) -> None:
+        self.__wrapped__ = cls
+        self.scope = scopes[scope]
+        self.weak = weak
+        self.dispose = dispose
+        self._lock = threading.Lock()
+        _fork_resets.add(self)
+
+    def __call__(self, *args, **kwargs):
+        storage = self.scope.storage()
+        instance = storage.get(self)
+        if self.weak and instance is not None:
+            instance = instance()
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = storage.get(self)
+            if self.weak and instance is not None:
+                instance = instance()
+            if instance is None:
+                instance = self.__wrapped__(*args, **kwargs)
+                storage[self] = weakref.ref(instance) if self.weak else instance
+        return instance
+
+    def __instancecheck__(self, instance) -> bool:
+        return isinstance(instance, self.__wrapped__)
+
+    def __subclasscheck__(self, subclass) -> bool:
+        return issubclass(subclass, self.__wrapped__)
+
+    def __repr__(self) -> str:
+        return f'<Scoped {self.__wrapped__.__qualname__} per {type(self.scope).__name__}>'
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+
+
+def scoped(scope: str = 'process', *, weak: bool = False, dispose=None):
+    def decorator(cls):
+        return Scoped(cls, scope, weak=weak, dispose=dispose)
+    return decorator
+
+
+def singleton(cls):
+    # One instance per process; the lock is only taken on first creation
+    return Scoped(cls, 'process')
 
 
 @singleton  # Applying the singleton decorator
@@ -57,3 +281,75 @@ class SingletonClass:
 
     def display(self):
         print(f"Singleton instance with data: {self.data}")
+
+
+def benchmark(threads: int = 8, lookups: int = 200_000):
+    """ Per-lookup cost under contention: unlocked original vs lock-free hot path vs always locking. """
+
+    class UnlockedMeta(type):
+        _instances = {}
+
+        def __call__(cls, *args, **kwargs):
+            if cls not in cls._instances:
+                cls._instances[cls] = super().__call__(*args, **kwargs)
+            return cls._instances[cls]
+
+    class AlwaysLockedMeta(type):
+        _instances = {}
+        _lock = threading.Lock()
+
+        def __call__(cls, *args, **kwargs):
+            with cls._lock:
+                if cls not in cls._instances:
+                    cls._instances[cls] = super().__call__(*args, **kwargs)
+                return cls._instances[cls]
+
+    variants = {
+        'unlocked': UnlockedMeta('Unlocked', (), {}),
+        'double-checked': SingletonMeta('DoubleChecked', (), {}),
+        'always locked': AlwaysLockedMeta('AlwaysLocked', (), {}),
+    }
+    for label, cls in variants.items():
+        start_gate = threading.Barrier(threads + 1)
+
+        def worker():
+            start_gate.wait()
+            for _ in range(lookups):
+                cls()
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in workers:
+            t.start()
+        start_gate.wait()
+        start = time.perf_counter()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - start
+        print(f'{label:>15}: {elapsed / (threads * lookups) * 1e9:.0f} ns/lookup')
+
+
+def benchmark_scopes(lookups: int = 500_000):
+    """ Cost of one lookup of an existing instance in each scope. """
+
+    class Resource:
+        pass
+
+    def run(label, provider):
+        keep = provider()  # keeps weakly held instances alive
+        start = time.perf_counter()
+        for _ in range(lookups):
+            provider()
+        elapsed = time.perf_counter() - start
+        print(f'{label:>14}: {elapsed / lookups * 1e9:.0f} ns/lookup')
+        del keep
+
+    run('process', Scoped(Resource, 'process'))
+    run('process weak', Scoped(Resource, 'process', weak=True))
+    run('thread', Scoped(Resource, 'thread'))
+    with request_scope():
+        run('request', Scoped(Resource, 'request'))
+
+    async def in_task():
+        run('task', Scoped(Resource, 'task'))
+
+    asyncio.run(in_task())
@@ -1,4 +1,8 @@
+import asyncio
+import threading
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import Future
 
 """
 What is the Adapter Pattern?
@@ -13,13 +17,227 @@ the source code of either the client or the adaptee (the class with the incompat
 
 
 class OldSystem:
-    def legacy_operation(self):
-        return "Legacy operation"
+    def legacy_operation(self, request=None):
+        return "Legacy operation" if request is None else f"Legacy operation {request}"
+
+    def legacy_bulk_operation(self, requests):
+        return [self.legacy_operation(request) for request in requests]
 
 
 class Adapter:
     def __init__(self, old_system):
         self.old_system = old_system
 
-    def new_operation(self):
-        return f"Adapter: {self.old_system.legacy_operation()}"
+    def new_operation(self, request=None):
+        return f"Adapter: {self.old_system.legacy_operation(request)}"
+
+
+class BatchingAdapter(Adapter):
+    """
+    Adapter that coalesces concurrent `new_operation` calls into one
+    `legacy_bulk_operation` call. A background thread sends a batch once
+    `max_batch` requests are waiting or `max_delay` seconds after the first
+    one arrived; requests that come in during a bulk call form the next
+    batch. With `memoize=True` results are cached per request, which is
+    only correct for pure legacy calls.
+    """
+
+    def __init__(self, old_system, max_batch=64, max_delay=0.002, memoize=False):
+        super().__init__(old_system)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.memo = {} if memoize else None
+        self._pending = []  # (request, future)
+        self._first_at = 0.0
+        self._cond = threading.Condition()
+        self._flusher = None
+
+    def new_operation(self, request=None):
+        _check_hashable(request)
+        if self.memo is not None and request in self.memo:
+            return self.memo[request]
+        future = Future()
+        with self._cond:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+            if not self._pending:
+                self._first_at = time.monotonic()
+            self._pending.append((request, future))
+            self._cond.notify()
+        return future.result()
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                while len(self._pending) < self.max_batch:
+                    remaining = self._first_at + self.max_delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                self._first_at = time.monotonic()
+            _resolve(self, batch, self.old_system.legacy_bulk_operation)
+
+
+class AsyncBatchingAdapter(Adapter):
+    """asyncio variant of BatchingAdapter; the blocking bulk call runs in a worker thread."""
+
+    def __init__(self, old_system, max_batch=64, max_delay=0.002, memoize=False):
+        super().__init__(old_system)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.memo = {} if memoize else None
+        self._pending = []
+        self._timer = None
+
+    async def new_operation(self, request=None):
+        _check_hashable(request)
+        if self.memo is not None and request in self.memo:
+            return self.memo[request]
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((request, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.get_running_loop().create_task(self._send(batch))
+
+    async def _send(self, batch):
+        try:
+            requests = _unique(batch)
+            results = await asyncio.to_thread(self.old_system.legacy_bulk_operation, requests)
+            outputs = _outputs(self, requests, results)
+        except Exception as e:
+            _fail(batch, e)
+            return
+        _fan_out(batch, outputs)
+
+
+def _check_hashable(request):
+    # batches are deduplicated by request; an unhashable one would break its whole batch
+    try:
+        hash(request)
+    except TypeError:
+        raise TypeError(f"Batched requests must be hashable, not {type(request).__name__}") from None
+
+
+def _unique(batch):
+    """Requests of a batch without duplicates, in arrival order."""
+    return list(dict.fromkeys(request for request, _ in batch))
+
+
+def _resolve(adapter, batch, bulk):
+    """Send one batch through `bulk` and settle every future in it, whatever happens."""
+    try:
+        requests = _unique(batch)
+        outputs = _outputs(adapter, requests, bulk(requests))
+    except Exception as e:
+        _fail(batch, e)
+        return
+    _fan_out(batch, outputs)
+
+
+def _outputs(adapter, requests, results):
+    results = list(results)
+    if len(results) != len(requests):
+        raise ValueError(f"legacy_bulk_operation returned {len(results)} results for {len(requests)} requests")
+    outputs = {request: f"Adapter: {result}" for request, result in zip(requests, results)}
+    if adapter.memo is not None:
+        adapter.memo.update(outputs)
+    return outputs
+
+
+def _fan_out(batch, outputs):
+    for request, future in batch:
+        if not future.done():
+            future.set_result(outputs[request])
+
+
+def _fail(batch, error):
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(error)
+
+
+class SlowOldSystem(OldSystem):
+    """
+    Legacy stand-in that serves one call at a time, where every call,
+    single or bulk, costs `call_cost` seconds.
+    """
+
+    def __init__(self, call_cost=0.005, item_cost=0.00001):
+        self.call_cost = call_cost
+        self.item_cost = item_cost
+        self._lock = threading.Lock()
+
+    def legacy_operation(self, request=None):
+        with self._lock:
+            time.sleep(self.call_cost)
+        return super().legacy_operation(request)
+
+    def legacy_bulk_operation(self, requests):
+        with self._lock:
+            time.sleep(self.call_cost + self.item_cost * len(requests))
+        return [OldSystem.legacy_operation(self, request) for request in requests]
+
+
+def benchmark(callers=64, calls=20, call_cost=0.005):
+    """Throughput and p50/p99 latency with `callers` concurrent clients, per adapter."""
+
+    def report(label, latencies, elapsed):
+        latencies.sort()
+        n = len(latencies)
+        print(f"{label:>14}: {n / elapsed:,.0f} calls/s, p50 {latencies[n // 2] * 1e3:.1f}ms, "
+              f"p99 {latencies[int(n * 0.99) - 1] * 1e3:.1f}ms")
+
+    for label, adapter in (("direct", Adapter(SlowOldSystem(call_cost))),
+                           ("batching", BatchingAdapter(SlowOldSystem(call_cost))),
+                           ("batching+memo", BatchingAdapter(SlowOldSystem(call_cost), memoize=True))):
+        latencies = []
+        lock = threading.Lock()
+
+        def client(n):
+            local = []
+            for i in range(calls):
+                start = time.perf_counter()
+                adapter.new_operation(i % 10 if label == "batching+memo" else (n, i))
+                local.append(time.perf_counter() - start)
+            with lock:
+                latencies.extend(local)
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(callers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        report(label, latencies, time.perf_counter() - start)
+
+    async def run_async():
+        adapter = AsyncBatchingAdapter(SlowOldSystem(call_cost))
+        latencies = []
+
+        async def client(n):
+            for i in range(calls):
+                start = time.perf_counter()
+                await adapter.new_operation((n, i))
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(n) for n in range(callers)))
+        report("async batching", latencies, time.perf_counter() - start)
+
+    asyncio.run(run_async())
@@ -17,6 +17,23 @@ for each dimension.
 Switch implementations at runtime: If you need the flexibility to replace implementation
 objects within the abstraction dynamically, the Bridge Pattern allows for easy implementation swapping.
 """
+import asyncio
+import hashlib
+import io
+import mmap
+import multiprocessing
+import os
+import queue
+import random
+import stat
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
 
 
 # Step 1: Define Abstraction (Abstract class)
@@ -33,25 +50,193 @@ class FileStorage(ABC):
 class StorageImplementation(ABC):
     """Abstract class representing the storage implementation."""
 
+    # How many saves the backend tolerates at once.
+    max_concurrency = 4
+
     @abstractmethod
-    def save(self, file_name):
-        """Abstract method to save a file."""
+    def save(self, file_name, source=None):
+        """
+        Abstract method to save a file. `source` is the content: bytes,
+        a memoryview, a binary file-like object or a path.
+        """
         pass
 
+    async def save_async(self, file_name, source=None):
+        """Save a file without blocking the event loop; runs `save` in a thread by default."""
+        return await asyncio.to_thread(self.save, file_name, source)
+
+    def load(self, file_name):
+        """Return the content of a saved file, for implementations that can read back."""
+        raise NotImplementedError(f"{type(self).__name__} cannot load files")
+
 
 # Step 3: Create Concrete Implementations
 class LocalStorage(StorageImplementation):
-    """Concrete implementation for local file storage."""
+    """
+    Concrete implementation for local file storage.
+
+    Content is streamed into `root` in `chunk_size` pieces and never held
+    in memory whole: file-to-file copies go through os.copy_file_range or
+    os.sendfile, bytes-like sources are written through memoryview slices,
+    and path sources are hashed through mmap. With `dedup=True` payloads
+    are stored once under `.objects/<sha256>` and saved names are hard
+    links to them.
+    """
+
+    def __init__(self, root=".", chunk_size=1024 * 1024, dedup=False):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.dedup = dedup
 
-    def save(self, file_name):
+    def save(self, file_name, source=None):
         """Save a file locally."""
+        if source is not None:
+            target = os.path.join(self.root, file_name)
+            if self.dedup:
+                self._link(self._store_object(source), target)
+            else:
+                # write next to the target and swap it in, so a failed save keeps the old file
+                tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+                try:
+                    with open(tmp, "wb") as dst:
+                        self._copy(source, dst)
+                    os.replace(tmp, target)
+                except BaseException:
+                    if os.path.exists(tmp):
+                        os.unlink(tmp)
+                    raise
         return f"File '{file_name}' saved locally"
 
+    def load(self, file_name):
+        """Read a locally saved file."""
+        with open(os.path.join(self.root, file_name), "rb") as f:
+            return f.read()
+
+    def _copy(self, source, dst, digest=None):
+        """Write `source` into the open binary file `dst`, feeding `digest` with what passes through Python."""
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            view = memoryview(source).cast("B")
+            for offset in range(0, len(view), self.chunk_size):
+                chunk = view[offset:offset + self.chunk_size]
+                if digest is not None:
+                    digest.update(chunk)
+                dst.write(chunk)
+        elif isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as src:
+                self._copy_from(src, dst, digest)
+        else:
+            self._copy_from(source, dst, digest)
+
+    def _copy_from(self, src, dst, digest):
+        """
+        Copy inside the kernel when `src` is a regular file and nothing needs
+        hashing; read pipes, sockets and in-memory streams in chunks.
+        """
+        try:
+            regular = stat.S_ISREG(os.fstat(src.fileno()).st_mode)
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            regular = False
+        if regular and digest is None:
+            self._copy_file(src, dst)
+        else:
+            self._copy_stream(src, dst, digest)
+
+    def _copy_stream(self, source, dst, digest):
+        buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        while read := source.readinto(buffer):
+            if digest is not None:
+                digest.update(view[:read])
+            dst.write(view[:read])
+
+    def _copy_file(self, src, dst):
+        """Copy between two real files inside the kernel, from the current position of `src`."""
+        dst.flush()
+        in_fd, out_fd = src.fileno(), dst.fileno()
+        offset = src.tell()
+        remaining = os.fstat(in_fd).st_size - offset
+        out_offset = dst.tell()
+        copied = 0
+        try:
+            while copied < remaining:
+                count = min(self.chunk_size * 64, remaining - copied)
+                try:
+                    sent = os.copy_file_range(in_fd, out_fd, count, offset + copied, out_offset + copied)
+                except (AttributeError, OSError):
+                    os.lseek(out_fd, out_offset + copied, os.SEEK_SET)
+                    sent = os.sendfile(out_fd, in_fd, offset + copied, count)
+                if sent == 0:
+                    break
+                copied += sent
+        except (AttributeError, OSError):
+            # neither call works between these files here: copy through userspace
+            src.seek(offset + copied)
+            dst.seek(out_offset + copied)
+            self._copy_stream(src, dst, None)
+            return
+        src.seek(offset + copied)
+        dst.seek(out_offset + copied)
+
+    def _store_object(self, source):
+        objects = os.path.join(self.root, ".objects")
+        os.makedirs(objects, exist_ok=True)
+        if isinstance(source, (bytes, bytearray, memoryview, str, os.PathLike)):
+            path = os.path.join(objects, self._hash(source))
+            if os.path.exists(path):
+                return path
+            digest = None
+        else:
+            # streams can only be read once: hash while writing
+            path = None
+            digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=objects)
+        try:
+            with os.fdopen(fd, "wb") as dst:
+                self._copy(source, dst, digest)
+            if path is None:
+                path = os.path.join(objects, digest.hexdigest())
+                if os.path.exists(path):
+                    os.unlink(tmp)
+                    return path
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return path
+
+    def _hash(self, source):
+        digest = hashlib.sha256()
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as src:
+                size = os.fstat(src.fileno()).st_size
+                if size:
+                    with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        view = memoryview(mapped)
+                        window = max(self.chunk_size // mmap.PAGESIZE, 1) * mmap.PAGESIZE
+                        for offset in range(0, size, window):
+                            digest.update(view[offset:offset + window])
+                            if hasattr(mapped, "madvise"):
+                                # drop hashed pages so the mapping does not grow RSS
+                                mapped.madvise(mmap.MADV_DONTNEED, offset, min(window, size - offset))
+                        view.release()
+        else:
+            digest.update(source)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _link(path, target):
+        tmp = f"{target}.{os.getpid()}.tmp"
+        os.link(path, tmp)
+        os.replace(tmp, target)
+
 
 class CloudStorage(StorageImplementation):
     """Concrete implementation for cloud file storage."""
 
-    def save(self, file_name):
+    max_concurrency = 32
+
+    def save(self, file_name, source=None):
         """Save a file to the cloud."""
         return f"File '{file_name}' saved to the cloud"
 
@@ -59,7 +244,9 @@ class CloudStorage(StorageImplementation):
 class NetworkStorage(StorageImplementation):
     """Concrete implementation for network file storage."""
 
-    def save(self, file_name):
+    max_concurrency = 8
+
+    def save(self, file_name, source=None):
         """Save a file to a network location."""
         return f"File '{file_name}' saved to a network location"
 
@@ -72,9 +259,404 @@ class AdvancedFileStorage(FileStorage):
         """Initialize with a specific storage implementation."""
         self._storage_impl = storage_impl
 
-    def save_file(self, file_name):
+    def save_file(self, file_name, source=None):
         """Save a file using the specified storage implementation."""
-        return self._storage_impl.save(file_name)
+        return self._storage_impl.save(file_name, source)
+
+    def save_files(self, items, retries=3, backoff=0.05):
+        """
+        Save many files on a thread pool sized by the implementation's
+        `max_concurrency`. Each item is a file name or a (file name, source)
+        pair. Saves failing with OSError are retried with exponential
+        backoff, unless their source is a stream that cannot be rewound.
+        Returns one SaveResult per item, in input order; a failed save never
+        affects the others.
+        """
+        impl = self._storage_impl
+        with ThreadPoolExecutor(impl.max_concurrency) as executor:
+            return list(executor.map(
+                lambda item: self._save_with_retry(item, retries, backoff), items
+            ))
+
+    async def save_files_async(self, items, retries=3, backoff=0.05):
+        """Async variant of `save_files`, bounded by a semaphore instead of a pool."""
+        limit = asyncio.Semaphore(self._storage_impl.max_concurrency)
+
+        async def save(item):
+            async with limit:
+                return await self._save_with_retry_async(item, retries, backoff)
+
+        return await asyncio.gather(*(save(item) for item in items))
+
+    def _save_with_retry(self, item, retries, backoff):
+        file_name, source = _batch_item(item)
+        rewind = _rewinder(source)
+        for attempt in range(1, retries + 2):
+            try:
+                return SaveResult(file_name, self._storage_impl.save(file_name, source), attempts=attempt)
+            except OSError as e:
+                if attempt > retries or rewind is None:
+                    return SaveResult(file_name, error=e, attempts=attempt)
+                time.sleep(backoff * 2 ** (attempt - 1))
+                rewind()
+            except Exception as e:
+                return SaveResult(file_name, error=e, attempts=attempt)
+
+    async def _save_with_retry_async(self, item, retries, backoff):
+        file_name, source = _batch_item(item)
+        rewind = _rewinder(source)
+        for attempt in range(1, retries + 2):
+            try:
+                result = await self._storage_impl.save_async(file_name, source)
+                return SaveResult(file_name, result, attempts=attempt)
+            except OSError as e:
+                if attempt > retries or rewind is None:
+                    return SaveResult(file_name, error=e, attempts=attempt)
+                await asyncio.sleep(backoff * 2 ** (attempt - 1))
+                rewind()
+            except Exception as e:
+                return SaveResult(file_name, error=e, attempts=attempt)
+
+
+@dataclass
+class SaveResult:
+    """Outcome of saving one file in a batch."""
+    file_name: str
+    result: Any = None
+    error: Exception | None = None
+    attempts: int = 1
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def _batch_item(item):
+    """Split a batch item into (file name, source)."""
+    return item if isinstance(item, tuple) else (item, None)
+
+
+def _rewinder(source):
+    """Return a function that makes `source` readable again for a retry, or None if it cannot."""
+    if source is None or isinstance(source, (bytes, bytearray, memoryview, str, os.PathLike)):
+        return lambda: None
+    try:
+        if source.seekable():
+            position = source.tell()
+            return lambda: source.seek(position)
+    except (AttributeError, OSError, ValueError):
+        pass
+    return None
+
+
+# Local stand-ins for slow backends
+class SimulatedLatency:
+    """Mixin that delays every save and fails a share of them with ConnectionError."""
+
+    def __init__(self, *args, latency=0.01, failure_rate=0.0, seed=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+
+    def save(self, file_name, source=None):
+        time.sleep(self.latency)
+        self._maybe_fail(file_name)
+        return super().save(file_name, source)
+
+    async def save_async(self, file_name, source=None):
+        await asyncio.sleep(self.latency)
+        self._maybe_fail(file_name)
+        return super().save(file_name, source)
+
+    def load(self, file_name):
+        time.sleep(self.latency)
+        self._maybe_fail(file_name)
+        return super().load(file_name)
+
+    def _maybe_fail(self, file_name):
+        if self._random.random() < self.failure_rate:
+            raise ConnectionError(f"Simulated failure saving '{file_name}'")
+
+
+class SimulatedCloudStorage(SimulatedLatency, CloudStorage):
+    """CloudStorage stand-in with configurable latency and failures."""
+
+
+class SimulatedNetworkStorage(SimulatedLatency, NetworkStorage):
+    """NetworkStorage stand-in with configurable latency and failures."""
+
+
+class SimulatedSlowStorage(SimulatedLatency, LocalStorage):
+    """Slow backend that really keeps the files, in a local directory."""
+
+
+class FlushError(Exception):
+    """Write-backs that gave up; `errors` maps each file name to its last error."""
+
+    def __init__(self, errors):
+        super().__init__(f"Could not flush {len(errors)} file(s): {', '.join(sorted(errors))}")
+        self.errors = errors
+
+
+class TieredStorage(StorageImplementation):
+    """
+    Storage implementation that puts a LocalStorage cache in front of a
+    slower backend.
+
+    'write-through' saves to the cache and then to the backend before
+    returning. 'write-back' returns once the file is in the cache and
+    recorded in the journal; a background thread flushes it to the backend.
+    The journal is replayed on start-up, so files that were not flushed
+    before a crash are flushed then, and files already in the cache are
+    served from it. Clean files are evicted least recently used first once
+    the cache holds more than `max_bytes`.
+
+    A flush that still fails after `flush_retries` retries leaves the file
+    dirty; `flush` and `close` then raise FlushError.
+
+    Files being saved or read are never evicted, and a cache miss does not
+    fill the cache if the file was saved while the backend was being read.
+    """
+
+    JOURNAL = ".journal"
+
+    def __init__(self, cache, backend, mode="write-back", max_bytes=256 * 1024 * 1024,
+                 flush_retries=5, retry_delay=0.05):
+        if mode not in ("write-through", "write-back"):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.cache = cache
+        self.backend = backend
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.flush_retries = flush_retries
+        self.retry_delay = retry_delay
+        self.max_concurrency = backend.max_concurrency
+        self.hits = self.misses = self.evictions = self.flushes = 0
+        self._entries = OrderedDict()  # file name -> size, least recently used first
+        # file name -> generation of its latest unflushed save; a flush only
+        # makes the file clean if no newer save arrived meanwhile
+        self._dirty = {}
+        self._generation = 0
+        self._failed = {}  # file name -> error of its last failed flush
+        self._busy = {}  # file name -> _Busy, while it is being saved or read
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._pending = queue.Queue()
+        self._journal_path = os.path.join(cache.root, self.JOURNAL)
+        self._recover()
+        self._journal = open(self._journal_path, "a")
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def save(self, file_name, source=None):
+        if source is None:
+            raise ValueError(f"TieredStorage needs the content of '{file_name}' to save it")
+        with self._lock:
+            self._pin(file_name, writing=True)
+        try:
+            self.cache.save(file_name, source)
+            path = self._cache_path(file_name)
+            size = os.path.getsize(path)
+            if self.mode == "write-through":
+                with self._lock:
+                    self._track(file_name, size)
+                return self.backend.save(file_name, path)
+            _fsync(path)
+            with self._lock:
+                # dirty before anything else can be evicted, so the file never is
+                self._generation += 1
+                generation = self._dirty[file_name] = self._generation
+                self._log("D", file_name)
+                self._track(file_name, size)
+        finally:
+            with self._lock:
+                self._unpin(file_name, writing=True)
+        self._pending.put((file_name, generation))
+        return f"File '{file_name}' saved to cache, flush pending"
+
+    def load(self, file_name):
+        with self._lock:
+            cached = file_name in self._entries
+            busy = self._pin(file_name)
+            saves = busy.saves
+            if cached:
+                self._entries.move_to_end(file_name)
+                self.hits += 1
+            else:
+                self.misses += 1
+        try:
+            if cached:
+                return self.cache.load(file_name)
+            data = self.backend.load(file_name)
+            with self._lock:
+                # a save that started meanwhile has newer content than the backend
+                if busy.saves == saves and not busy.writers:
+                    self.cache.save(file_name, data)
+                    self._track(file_name, len(data))
+            return data
+        finally:
+            with self._lock:
+                self._unpin(file_name)
+
+    def flush(self):
+        """Block until every pending write-back has reached the backend or given up."""
+        self._pending.join()
+        with self._lock:
+            failed = dict(self._failed)
+        if failed:
+            raise FlushError(failed)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._pending.put(None)
+            self._flusher.join()
+            self._journal.close()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "flushes": self.flushes, "cached_bytes": self._bytes, "dirty": len(self._dirty),
+                    "failed": len(self._failed)}
+
+    def _cache_path(self, file_name):
+        return os.path.join(self.cache.root, file_name)
+
+    def _pin(self, file_name, writing=False):
+        """Keep `file_name` from being evicted until `_unpin`. Caller holds the lock."""
+        busy = self._busy.get(file_name)
+        if busy is None:
+            busy = self._busy[file_name] = _Busy()
+        busy.users += 1
+        if writing:
+            busy.writers += 1
+            busy.saves += 1
+        return busy
+
+    def _unpin(self, file_name, writing=False):
+        """Caller holds the lock."""
+        busy = self._busy[file_name]
+        busy.users -= 1
+        if writing:
+            busy.writers -= 1
+        if not busy.users:
+            del self._busy[file_name]
+
+    def _track(self, file_name, size):
+        """Caller holds the lock."""
+        self._bytes += size - self._entries.pop(file_name, 0)
+        self._entries[file_name] = size
+        self._evict(keep=file_name)
+
+    def _evict(self, keep=None):
+        """Drop clean files, least recently used first, until the cache fits. Caller holds the lock."""
+        for name in list(self._entries):
+            if self._bytes <= self.max_bytes:
+                break
+            if name in self._dirty or name in self._busy or name == keep:
+                continue
+            self._bytes -= self._entries.pop(name)
+            self.evictions += 1
+            os.unlink(self._cache_path(name))
+
+    def _flush_loop(self):
+        while (item := self._pending.get()) is not None:
+            try:
+                self._flush_one(*item)
+            finally:
+                self._pending.task_done()
+
+    def _flush_one(self, file_name, generation):
+        with self._lock:
+            if self._dirty.get(file_name) != generation:
+                # a newer save is queued behind this one and will flush the file
+                return
+        try:
+            self._save_to_backend(file_name)
+        except Exception as e:
+            with self._lock:
+                self._failed[file_name] = e
+            return
+        with self._lock:
+            self._failed.pop(file_name, None)
+            self.flushes += 1
+            if self._dirty.get(file_name) == generation:
+                del self._dirty[file_name]
+                self._log("C", file_name)
+                # clean now, so it may be what brings the cache back under max_bytes
+                self._evict()
+
+    def _save_to_backend(self, file_name):
+        for attempt in range(self.flush_retries + 1):
+            try:
+                return self.backend.save(file_name, self._cache_path(file_name))
+            except OSError:
+                if attempt == self.flush_retries:
+                    raise
+                time.sleep(self.retry_delay * 2 ** attempt)
+
+    def _log(self, kind, file_name):
+        """Append a journal record. Caller holds the lock."""
+        self._journal.write(f"{kind} {file_name}\n")
+        self._journal.flush()
+        if kind == "D":
+            os.fsync(self._journal.fileno())
+
+    def _recover(self):
+        """Re-queue writes that were journaled but never flushed, then compact the journal."""
+        dirty = {}
+        if os.path.exists(self._journal_path):
+            with open(self._journal_path) as journal:
+                for line in journal:
+                    kind, _, file_name = line.rstrip("\n").partition(" ")
+                    if kind == "D":
+                        dirty[file_name] = None
+                    else:
+                        dirty.pop(file_name, None)
+        pending = [name for name in dirty if os.path.exists(self._cache_path(name))]
+        with open(self._journal_path, "w") as journal:
+            journal.writelines(f"D {name}\n" for name in pending)
+        # clean files left in the cache count too, oldest first
+        for file_name, size, _ in sorted(self._cached_files(), key=lambda entry: entry[2]):
+            self._entries[file_name] = size
+            self._bytes += size
+        for file_name in pending:
+            self._generation += 1
+            self._dirty[file_name] = self._generation
+            self._entries.move_to_end(file_name)
+            self._pending.put((file_name, self._generation))
+        self._evict()
+
+    def _cached_files(self):
+        """(file name, size, mtime) of every file in the cache directory."""
+        root = self.cache.root
+        for directory, subdirectories, files in os.walk(root):
+            if directory == root:
+                subdirectories[:] = [d for d in subdirectories if d != ".objects"]
+            for name in files:
+                path = os.path.join(directory, name)
+                if path == self._journal_path:
+                    continue
+                info = os.stat(path)
+                yield os.path.relpath(path, root), info.st_size, info.st_mtime
+
+
+class _Busy:
+    """Saves and reads in progress on one TieredStorage file."""
+    __slots__ = ("users", "writers", "saves")
+
+    def __init__(self):
+        self.users = self.writers = self.saves = 0
+
+
+def _fsync(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
 
 
 def test():
@@ -91,3 +673,115 @@ def test():
     print(advanced_local_storage.save_file("example.txt"))
     print(advanced_cloud_storage.save_file("example.txt"))
     print(advanced_network_storage.save_file("example.txt"))
+
+
+def benchmark(files=500, latency=0.01, failure_rate=0.05):
+    """Files/sec for one-at-a-time, threaded and async batch saves against simulated backends."""
+    names = [f"file{i}.bin" for i in range(files)]
+    for impl_class in (SimulatedCloudStorage, SimulatedNetworkStorage):
+        storage = AdvancedFileStorage(impl_class(latency=latency, failure_rate=failure_rate, seed=0))
+        start = time.perf_counter()
+        for name in names[:50]:
+            try:
+                storage.save_file(name)
+            except ConnectionError:
+                pass
+        serial = 50 / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results = storage.save_files(names)
+        threaded = files / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        asyncio.run(storage.save_files_async(names))
+        concurrent = files / (time.perf_counter() - start)
+
+        failed = sum(not r.ok for r in results)
+        retried = sum(r.attempts > 1 for r in results)
+        print(f"{impl_class.__name__}: serial {serial:.0f}/s, threads {threaded:.0f}/s, "
+              f"async {concurrent:.0f}/s ({retried} retried, {failed} failed)")
+
+
+def _measure_copy(variant, source, root):
+    """Runs in a fresh process so ru_maxrss reflects only this copy."""
+    import resource
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if variant == "naive":
+        with open(source, "rb") as src:
+            data = src.read()
+        with open(os.path.join(root, "naive.bin"), "wb") as dst:
+            dst.write(data)
+    elif variant == "stream":
+        with open(source, "rb") as src:
+            LocalStorage(root).save("stream.bin", _Unfileno(src))
+    else:
+        LocalStorage(root, dedup=variant == "dedup").save(f"{variant}.bin", source)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return elapsed, (peak - baseline) * 1024
+
+
+class _Unfileno(io.RawIOBase):
+    """Hides the file descriptor of a file so it is copied through the chunked stream path."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._raw.readinto(buffer)
+
+
+def benchmark_local(size_mb=256):
+    """GB/s and extra peak RSS of LocalStorage against a naive read-all/write-all copy."""
+    context = multiprocessing.get_context("fork")
+    with tempfile.TemporaryDirectory() as root:
+        source = os.path.join(root, "source.bin")
+        with open(source, "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024 * 1024))
+        for variant in ("naive", "copy_file_range", "stream", "dedup", "dedup"):
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                elapsed, rss = executor.submit(_measure_copy, variant, source, root).result()
+            print(f"{variant:>15}: {size_mb / 1024 / elapsed:.2f} GB/s, peak RSS +{rss / 2 ** 20:.0f} MB")
+
+
+def benchmark_tiered(files=200, operations=2000, latency=0.005, write_ratio=0.2):
+    """Ops/sec on a skewed read/write workload: slow backend alone vs. tiered in both modes."""
+    payloads = {f"file{i}.bin": os.urandom(16 * 1024) for i in range(files)}
+    rng = random.Random(0)
+    # a few hot files take most of the traffic
+    workload = [(rng.random() < write_ratio, f"file{min(int(rng.paretovariate(1.2)) - 1, files - 1)}.bin")
+                for _ in range(operations)]
+
+    with tempfile.TemporaryDirectory() as root:
+        for label in ("backend only", "write-through", "write-back"):
+            backend_root = os.path.join(root, label, "backend")
+            cache_root = os.path.join(root, label, "cache")
+            os.makedirs(backend_root)
+            os.makedirs(cache_root)
+            backend = SimulatedSlowStorage(backend_root, latency=latency)
+            for name, data in payloads.items():
+                LocalStorage(backend_root).save(name, data)
+            if label == "backend only":
+                storage = backend
+            else:
+                storage = TieredStorage(LocalStorage(cache_root), backend, mode=label,
+                                        max_bytes=files * 16 * 1024 // 4)
+            start = time.perf_counter()
+            for write, name in workload:
+                if write:
+                    storage.save(name, payloads[name])
+                else:
+                    storage.load(name)
+            elapsed = time.perf_counter() - start
+            line = f"{label:>13}: {operations / elapsed:,.0f} ops/s"
+            if isinstance(storage, TieredStorage):
+                storage.close()
+                stats = storage.stats()
+                line += f", hit rate {stats['hits'] / max(stats['hits'] + stats['misses'], 1):.0%}, {stats}"
+            print(line)
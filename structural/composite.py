@@ -1,4 +1,15 @@
+import hashlib
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
 from abc import ABC, abstractmethod
+from array import array
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 
 """
 The Composite Design Pattern is a structural approach that organizes objects into tree-like
@@ -17,29 +28,450 @@ within software hierarchies.
 
 
 class Component(ABC):
+    """
+    Every node keeps aggregates over its subtree: total `size`, `leaf_count`
+    and `depth` (number of levels, 1 for a leaf). They are maintained as the
+    tree changes, so reading them does not walk the tree.
+    """
+    __slots__ = ()
+    parent: 'CompositeFile | None' = None
+
     @abstractmethod
     def operation(self) -> str:
         pass
 
+    @property
+    @abstractmethod
+    def size(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def leaf_count(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def depth(self) -> int:
+        pass
+
 
 class LeafFile(Component):
-    def __init__(self, name: str) -> None:
+    def __init__(self, name: str, size: int = 0) -> None:
         self.name = name
+        self._size = size
 
     def operation(self) -> str:
         return f'LeafFile: {self.name}'
 
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @size.setter
+    def size(self, size: int) -> None:
+        delta = size - self._size
+        self._size = size
+        node = self.parent if delta else None
+        while node is not None:
+            node._size += delta
+            node = node.parent
+
+    @property
+    def leaf_count(self) -> int:
+        return 1
+
+    @property
+    def depth(self) -> int:
+        return 1
+
+    def __getstate__(self):
+        # do not drag the ancestors along when a subtree is pickled
+        state = self.__dict__.copy()
+        state.pop('parent', None)
+        return state
+
 
 class CompositeFile(Component):
+    """
+    Sums are updated eagerly along the parent chain, O(depth) per change
+    that alters them. `depth` is lazy: `add` and `remove` mark the
+    ancestors dirty, stopping at the first one that already is, and the
+    affected levels are recomputed on the next read.
+    """
+
     def __init__(self, name: str) -> None:
         self.name = name
         self.children: list[Component] = []
+        self._size = 0
+        self._leaf_count = 0
+        self._depth = 1
+        self._dirty = False
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def leaf_count(self) -> int:
+        return self._leaf_count
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('parent', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for child in self.children:
+            child.parent = self
+
+    @property
+    def depth(self) -> int:
+        if self._dirty:
+            self._refresh_depth()
+        return self._depth
 
     def add(self, component: Component) -> None:
+        # only a composite with children can be an ancestor of self
+        if component is self or (isinstance(component, CompositeFile) and component.children):
+            node = self
+            while node is not None:
+                if node is component:
+                    raise ValueError('Cannot add a component to its own subtree')
+                node = node.parent
+        if component.parent is not None:
+            component.parent.remove(component)
+        component.parent = self
         self.children.append(component)
+        self._propagate(component.size, component.leaf_count)
+        if not self._dirty and component.depth >= self._depth:
+            self._mark_dirty()
+
+    def remove(self, component: Component) -> None:
+        self.children.remove(component)
+        component.parent = None
+        self._propagate(-component.size, -component.leaf_count)
+        self._mark_dirty()
+
+    def _mark_dirty(self) -> None:
+        # a dirty node has dirty ancestors, so stop at the first one
+        node = self
+        while node is not None and not node._dirty:
+            node._dirty = True
+            node = node.parent
+
+    def _propagate(self, size: int, leaf_count: int) -> None:
+        if not size and not leaf_count:
+            return
+        node = self
+        while node is not None:
+            node._size += size
+            node._leaf_count += leaf_count
+            node = node.parent
+
+    def _refresh_depth(self) -> None:
+        # post-order over dirty nodes only, without recursion
+        stack = [self]
+        while stack:
+            node = stack[-1]
+            dirty = [c for c in node.children if isinstance(c, CompositeFile) and c._dirty]
+            if dirty:
+                stack.extend(dirty)
+                continue
+            node._depth = 1 + max((c.depth for c in node.children), default=0)
+            node._dirty = False
+            stack.pop()
+
+    def operation(self) -> str:
+        return ''.join(self.iter_operation())
+
+    def iter_operation(self, buffer_size: int = 64 * 1024) -> Iterator[str]:
+        """
+        Yield the output of `operation()` in chunks of roughly `buffer_size`
+        characters. Walks the tree with an explicit stack, so depth is not
+        bound by the recursion limit.
+        """
+        parts = [f'CompositeFile: {self.name} (']
+        buffered = len(parts[0])
+        # [remaining children, whether the next child is the first one]
+        stack = [[iter(self.children), True]]
+        while stack:
+            frame = stack[-1]
+            child = next(frame[0], None)
+            if child is None:
+                stack.pop()
+                part = ')'
+            else:
+                part = '' if frame[1] else ', '
+                frame[1] = False
+                if isinstance(child, CompositeFile):
+                    part += f'CompositeFile: {child.name} ('
+                    stack.append([iter(child.children), True])
+                else:
+                    part += child.operation()
+            parts.append(part)
+            buffered += len(part)
+            if buffered >= buffer_size:
+                yield ''.join(parts)
+                parts.clear()
+                buffered = 0
+        if parts:
+            yield ''.join(parts)
+
+    def write_operation(self, fp) -> int:
+        """ Stream the output of `operation()` into the writable text object `fp`. """
+        written = 0
+        for chunk in self.iter_operation():
+            fp.write(chunk)
+            written += len(chunk)
+        return written
+
+
+def _render_batch(components: list[Component]) -> str:
+    return ', '.join(component.operation() for component in components)
+
+
+class ParallelEvaluator:
+    """
+    Evaluates `operation()` of a large tree on a pool of workers.
+
+    The tree is cut into batches of consecutive siblings holding about
+    `threshold` leaves each; composites larger than that are opened up and
+    only their own framing is rendered here. Batches run on a process pool
+    in 'cpu' mode (leaves must be picklable) or a thread pool in 'io' mode,
+    and the results are joined in tree order, so the output is identical
+    to `operation()`.
+    """
+
+    def __init__(self, mode: str = 'io', workers: int | None = None, threshold: int = 1000) -> None:
+        executors = {'cpu': ProcessPoolExecutor, 'io': ThreadPoolExecutor}
+        if mode not in executors:
+            raise ValueError(f'Unknown mode: {mode}')
+        self._executor_class = executors[mode]
+        self._workers = workers
+        self._threshold = threshold
+
+    def evaluate(self, root: Component) -> str:
+        if not isinstance(root, CompositeFile) or root.leaf_count <= self._threshold:
+            return root.operation()
+        with self._executor_class(self._workers) as executor:
+            pieces = self._split(root, executor)
+            return ''.join(p if isinstance(p, str) else p.result() for p in pieces)
+
+    def _split(self, root: 'CompositeFile', executor) -> list[str | Future]:
+        threshold = self._threshold
+        pieces: list[str | Future] = [f'CompositeFile: {root.name} (']
+        batch: list[Component] = []
+        weight = 0
+        # [remaining children, whether anything was rendered in this composite yet]
+        stack = [[iter(root.children), False]]
+        while stack:
+            frame = stack[-1]
+            child = next(frame[0], None)
+            if child is None or (isinstance(child, CompositeFile) and child.leaf_count > threshold):
+                if batch:
+                    pieces.append(executor.submit(_render_batch, batch))
+                    batch, weight = [], 0
+                if child is None:
+                    stack.pop()
+                    pieces.append(')')
+                else:
+                    pieces.append(f'{", " if frame[1] else ""}CompositeFile: {child.name} (')
+                    frame[1] = True
+                    stack.append([iter(child.children), False])
+                continue
+            if not batch and frame[1]:
+                pieces.append(', ')
+            frame[1] = True
+            batch.append(child)
+            weight += max(child.leaf_count, 1)
+            if weight >= threshold:
+                pieces.append(executor.submit(_render_batch, batch))
+                batch, weight = [], 0
+        return pieces
+
+
+class CompactTree:
+    """
+    Columnar storage for large trees: one entry per node in parallel
+    arrays (kind, parent, first/last child, next sibling, interned name,
+    subtree size, leaf count and depth) instead of one Python object per
+    node.
+    Nodes are append-only and are reached through lightweight CompactNode
+    views that implement Component.
+    """
+
+    LEAF = 0
+    COMPOSITE = 1
+
+    def __init__(self, root_name: str) -> None:
+        self._kind = array('b')
+        self._parent = array('i')
+        self._first_child = array('i')
+        self._last_child = array('i')
+        self._next_sibling = array('i')
+        self._name = array('i')
+        self._size = array('q')
+        self._leaf_count = array('i')
+        self._depth = array('i')
+        self._names: list[str] = []
+        self._name_ids: dict[str, int] = {}
+        self._append(self.COMPOSITE, -1, root_name, 0)
+
+    def __len__(self) -> int:
+        return len(self._kind)
+
+    @property
+    def root(self) -> 'CompactNode':
+        return CompactNode(self, 0)
+
+    def add_composite(self, parent: int, name: str) -> int:
+        return self._append(self.COMPOSITE, parent, name, 0)
+
+    def add_leaf(self, parent: int, name: str, size: int = 0) -> int:
+        return self._append(self.LEAF, parent, name, size)
+
+    def _append(self, kind: int, parent: int, name: str, size: int) -> int:
+        if parent != -1 and self._kind[parent] != self.COMPOSITE:
+            raise ValueError('Children can only be added to composite nodes')
+        index = len(self._kind)
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self._names)
+            self._names.append(name)
+        self._kind.append(kind)
+        self._parent.append(parent)
+        self._first_child.append(-1)
+        self._last_child.append(-1)
+        self._next_sibling.append(-1)
+        self._name.append(name_id)
+        self._size.append(0)
+        self._leaf_count.append(0)
+        self._depth.append(1)
+        if parent != -1:
+            last = self._last_child[parent]
+            if last == -1:
+                self._first_child[parent] = index
+            else:
+                self._next_sibling[last] = index
+            self._last_child[parent] = index
+        leaves = 1 if kind == self.LEAF else 0
+        depth = 1
+        node = index
+        while node != -1:
+            self._size[node] += size
+            self._leaf_count[node] += leaves
+            if self._depth[node] < depth:
+                self._depth[node] = depth
+            depth = self._depth[node] + 1
+            node = self._parent[node]
+        return index
+
+    def name(self, index: int) -> str:
+        return self._names[self._name[index]]
+
+    def children(self, index: int) -> Iterator[int]:
+        child = self._first_child[index]
+        while child != -1:
+            yield child
+            child = self._next_sibling[child]
+
+    def iter_operation(self, index: int = 0, buffer_size: int = 64 * 1024) -> Iterator[str]:
+        """ Same output as Component.operation() for the subtree at `index`, in chunks. """
+        kind, first, next_sibling, names, name = (
+            self._kind, self._first_child, self._next_sibling, self._names, self._name
+        )
+        if kind[index] == self.LEAF:
+            yield f'LeafFile: {names[name[index]]}'
+            return
+        parts = [f'CompositeFile: {names[name[index]]} (']
+        buffered = len(parts[0])
+        # the child each open composite is currently at, -1 once it is exhausted
+        stack = [first[index]]
+        while stack:
+            child = stack[-1]
+            if child == -1:
+                stack.pop()
+                part = ')'
+                if stack:
+                    sibling = next_sibling[stack[-1]]
+                    stack[-1] = sibling
+                    if sibling != -1:
+                        part += ', '
+            elif kind[child] == self.COMPOSITE:
+                part = f'CompositeFile: {names[name[child]]} ('
+                stack.append(first[child])
+            else:
+                part = f'LeafFile: {names[name[child]]}'
+                sibling = next_sibling[child]
+                stack[-1] = sibling
+                if sibling != -1:
+                    part += ', '
+            parts.append(part)
+            buffered += len(part)
+            if buffered >= buffer_size:
+                yield ''.join(parts)
+                parts.clear()
+                buffered = 0
+        if parts:
+            yield ''.join(parts)
+
+    @classmethod
+    def from_component(cls, component: 'CompositeFile') -> 'CompactTree':
+        tree = cls(component.name)
+        queue = deque((child, 0) for child in component.children)
+        while queue:
+            node, parent = queue.popleft()
+            if isinstance(node, CompositeFile):
+                index = tree.add_composite(parent, node.name)
+                queue.extend((child, index) for child in node.children)
+            else:
+                tree.add_leaf(parent, node.name, node.size)
+        return tree
+
+
+class CompactNode(Component):
+    """ View of one CompactTree entry; creating one allocates nothing else. """
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree: CompactTree, index: int) -> None:
+        self.tree = tree
+        self.index = index
+
+    @property
+    def name(self) -> str:
+        return self.tree.name(self.index)
+
+    @property
+    def parent(self) -> 'CompactNode | None':
+        parent = self.tree._parent[self.index]
+        return None if parent == -1 else CompactNode(self.tree, parent)
+
+    @property
+    def children(self) -> list['CompactNode']:
+        return [CompactNode(self.tree, child) for child in self.tree.children(self.index)]
 
     def operation(self) -> str:
-        return f'CompositeFile: {self.name} ({", ".join(c.operation() for c in self.children)})'
+        return ''.join(self.tree.iter_operation(self.index))
+
+    def add_leaf(self, name: str, size: int = 0) -> 'CompactNode':
+        return CompactNode(self.tree, self.tree.add_leaf(self.index, name, size))
+
+    def add_composite(self, name: str) -> 'CompactNode':
+        return CompactNode(self.tree, self.tree.add_composite(self.index, name))
+
+    @property
+    def size(self) -> int:
+        return self.tree._size[self.index]
+
+    @property
+    def leaf_count(self) -> int:
+        return self.tree._leaf_count[self.index]
+
+    @property
+    def depth(self) -> int:
+        return self.tree._depth[self.index]
 
 
 def test():
@@ -53,3 +485,165 @@ def test():
     folder2.add(file3)
     folder1.add(folder2)
     print(folder1.operation())
+
+
+def benchmark(depth: int = 100_000, width: int = 1_000_000):
+    """ Streaming render of a `depth`-deep chain and a `width`-wide folder, against the recursive version. """
+
+    def recursive(node: Component) -> str:
+        if isinstance(node, CompositeFile):
+            return f'CompositeFile: {node.name} ({", ".join(recursive(c) for c in node.children)})'
+        return node.operation()
+
+    deep = CompositeFile('root')
+    node = deep
+    for i in range(depth):
+        child = CompositeFile(f'dir{i}')
+        node.add(child)
+        node = child
+    node.add(LeafFile('file.txt'))
+
+    wide = CompositeFile('root')
+    for i in range(width):
+        wide.add(LeafFile(f'file{i}.txt'))
+
+    for label, tree in (('deep', deep), ('wide', wide)):
+        out = io.StringIO()
+        start = time.perf_counter()
+        tree.write_operation(out)
+        streamed = time.perf_counter() - start
+        try:
+            start = time.perf_counter()
+            expected = recursive(tree)
+            result = f'{time.perf_counter() - start:.3f}s, identical={expected == out.getvalue()}'
+        except RecursionError:
+            result = f'RecursionError at recursion limit {sys.getrecursionlimit()}'
+        print(f'{label}: streamed {out.tell() / 1e6:.1f}M chars in {streamed:.3f}s; recursive: {result}')
+
+
+def benchmark_aggregates(fanout: int = 100, operations: int = 100_000):
+    """
+    Mixed mutations and root queries on a fanout**3 leaf tree (1M leaves
+    by default), against recomputing the aggregates with a full walk.
+    """
+    root = CompositeFile('root')
+    folders = []
+    for i in range(fanout):
+        top = CompositeFile(f'd{i}')
+        root.add(top)
+        for j in range(fanout):
+            folder = CompositeFile(f'd{i}_{j}')
+            top.add(folder)
+            folders.append(folder)
+            for k in range(fanout):
+                folder.add(LeafFile(f'f{k}', size=k))
+
+    def walk(node: Component) -> tuple[int, int]:
+        size = leaves = 0
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, CompositeFile):
+                stack.extend(node.children)
+            else:
+                size += node.size
+                leaves += 1
+        return size, leaves
+
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for i in range(operations):
+        folder = rng.choice(folders)
+        if i % 2:
+            folder.add(LeafFile('new', size=1))
+        else:
+            folder.remove(folder.children[-1])
+        root.size, root.leaf_count, root.depth
+    elapsed = time.perf_counter() - start
+    print(f'incremental: {operations / elapsed:,.0f} mutations+queries/s')
+
+    queries = 5
+    start = time.perf_counter()
+    for _ in range(queries):
+        walk(root)
+    elapsed = time.perf_counter() - start
+    print(f'  full walk: {queries / elapsed:,.2f} queries/s')
+    assert walk(root) == (root.size, root.leaf_count)
+
+
+def benchmark_memory(nodes: int = 1_000_000, fanout: int = 100):
+    """ Traced bytes per node for CompositeFile/LeafFile objects vs a CompactTree. """
+
+    def build_objects():
+        root = CompositeFile('root')
+        folder = root
+        for i in range(nodes - 1):
+            if i % (fanout + 1) == 0:
+                folder = CompositeFile(f'dir{i}')
+                root.add(folder)
+            else:
+                folder.add(LeafFile(f'file{i % fanout}.txt', size=i))
+        return root
+
+    def build_compact():
+        tree = CompactTree('root')
+        folder = 0
+        for i in range(nodes - 1):
+            if i % (fanout + 1) == 0:
+                folder = tree.add_composite(0, f'dir{i}')
+            else:
+                tree.add_leaf(folder, f'file{i % fanout}.txt', size=i)
+        return tree
+
+    for label, build in (('objects', build_objects), ('compact', build_compact)):
+        tracemalloc.start()
+        tree = build()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'{label}: {current / nodes:.1f} bytes/node')
+        del tree
+
+
+class HashingLeafFile(LeafFile):
+    """ Leaf with a CPU-bound operation, for benchmarking. """
+
+    def operation(self) -> str:
+        digest = self.name.encode()
+        for _ in range(200):
+            digest = hashlib.sha256(digest).digest()
+        return f'LeafFile: {self.name} {digest.hex()[:8]}'
+
+
+class StatLeafFile(LeafFile):
+    """ Leaf with an I/O-bound operation, for benchmarking. """
+
+    def operation(self) -> str:
+        time.sleep(0.0005)
+        return f'LeafFile: {self.name}'
+
+
+def benchmark_parallel(leaves: int = 20_000, fanout: int = 50, threshold: int = 500):
+    """ Scaling of ParallelEvaluator from 1 to N workers in both modes. """
+    for mode, leaf_class in (('cpu', HashingLeafFile), ('io', StatLeafFile)):
+        root = CompositeFile('root')
+        folder = root
+        for i in range(leaves):
+            if i % fanout == 0:
+                folder = CompositeFile(f'dir{i}')
+                root.add(folder)
+            folder.add(leaf_class(f'file{i}'))
+
+        start = time.perf_counter()
+        expected = root.operation()
+        serial = time.perf_counter() - start
+        print(f'{mode}: serial {serial:.2f}s')
+        workers = 1
+        max_workers = (os.cpu_count() or 1) if mode == 'cpu' else 32
+        while workers <= max_workers:
+            evaluator = ParallelEvaluator(mode, workers=workers, threshold=threshold)
+            start = time.perf_counter()
+            result = evaluator.evaluate(root)
+            elapsed = time.perf_counter() - start
+            assert result == expected
+            print(f'{mode}: {workers:>3} workers {elapsed:.2f}s, speedup {serial / elapsed:.1f}x')
+            workers *= 2
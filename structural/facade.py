@@ -13,7 +13,17 @@ Subsystem Classes: Unaware of the facade, these classes interact directly within
 the system, collaborating with each other for functionality.
 Client: Utilizes the facade to interact with the subsystem, avoiding direct calls to its objects.
 """
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
 from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 
 # Step 1: Create Subsystem Classes for Payment Gateways
@@ -33,24 +43,467 @@ class CryptoGateway:
         return f"Payment of ${amount} processed via Crypto (Bitcoin)"
 
 
-# Step 2: Implement Facade Class
+class SimulatedGateway:
+    """Stand-in gateway that takes `latency` seconds per payment."""
+
+    def __init__(self, name='simulated', latency=0.01):
+        self.name = name
+        self.latency = latency
+
+    def charge(self, amount):
+        time.sleep(self.latency)
+        return f"Payment of ${amount} processed via {self.name}"
+
+
+# Step 2: Register gateways; the facade dispatches through this table
+
+_gateways = {}
+
+
+def register_gateway(name, factory, method, max_concurrency=4):
+    """
+    Make a gateway available to facades created afterwards. `factory`
+    builds the subsystem object, `method` names its payment method and
+    `max_concurrency` caps parallel calls to it through one facade.
+    """
+    _gateways[name] = (factory, method, max_concurrency)
+
+
+register_gateway('paypal', PayPalGateway, 'process_payment')
+register_gateway('stripe', StripeGateway, 'pay')
+register_gateway('crypto', CryptoGateway, 'make_payment')
+
+
+# Step 3: Health tracking per gateway
+
+class GatewayUnavailable(Exception):
+    """
+    Raised when no gateway can take a payment because their circuits are
+    open. Gateways may raise it too, for payments they refused unsent.
+    """
+
+
+class GatewayMetrics:
+    """Latency histogram, request/error/in-flight counters and a window of recent calls for one gateway."""
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, window=200):
+        self.bucket_counts = [0] * (len(self.BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._recent = deque(maxlen=window)  # (latency, ok)
+        self._lock = threading.Lock()
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def observe(self, latency, ok):
+        """Record the outcome of a call started with `begin`."""
+        with self._lock:
+            self.in_flight -= 1
+            self.bucket_counts[bisect_left(self.BUCKETS, latency)] += 1
+            self.latency_sum += latency
+            self.requests += 1
+            self.errors += not ok
+            self._recent.append((latency, ok))
+
+    def p95(self):
+        """Recent 95th percentile latency, 0.0 before any call."""
+        with self._lock:
+            latencies = sorted(latency for latency, _ in self._recent)
+        if not latencies:
+            return 0.0
+        return latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+
+    def error_rate(self):
+        with self._lock:
+            recent = list(self._recent)
+        return sum(not ok for _, ok in recent) / len(recent) if recent else 0.0
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures. After
+    `reset_timeout` seconds it lets a single probe through (half-open):
+    success closes the circuit, failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def available(self):
+        """Whether a call could go through now, without claiming the probe."""
+        with self._lock:
+            return self.state == self.CLOSED or (
+                not self._probing and time.monotonic() - self._opened_at >= self.reset_timeout
+            )
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probing = True
+            return True
+
+    def record(self, ok):
+        with self._lock:
+            self._probing = False
+            if ok:
+                self.state = self.CLOSED
+                self._failures = 0
+                return
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+# Step 4: Implement Facade Class
 
 class PaymentFacade:
-    def __init__(self):
-        self._paypal = PayPalGateway()
-        self._stripe = StripeGateway()
-        self._crypto = CryptoGateway()
+    # gateway name that routes to the healthy gateway with the lowest recent p95
+    ANY = 'any'
+    # errors after which a payment surely was not sent, so `ANY` may try the next gateway
+    NOT_SENT = (GatewayUnavailable, ConnectionRefusedError)
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        # gateway name -> (bound payment method, max concurrency)
+        self._dispatch = {
+            name: (getattr(factory(), method), max_concurrency)
+            for name, (factory, method, max_concurrency) in _gateways.items()
+        }
+        self._slots = {name: threading.BoundedSemaphore(limit) for name, (_, limit) in self._dispatch.items()}
+        self._metrics = {name: GatewayMetrics() for name in self._dispatch}
+        self._breakers = {name: CircuitBreaker(failure_threshold, reset_timeout) for name in self._dispatch}
 
     def process_payment(self, amount, gateway):
-        """Processes payment through the selected gateway."""
-        if gateway == 'paypal':
-            return self._paypal.process_payment(amount)
-        elif gateway == 'stripe':
-            return self._stripe.pay(amount)
-        elif gateway == 'crypto':
-            return self._crypto.make_payment(amount)
-        else:
+        """Processes payment through the selected gateway, or the best one for `ANY`."""
+        if gateway == self.ANY:
+            cause = None
+            for candidate in self._route():
+                if self._breakers[candidate].allow():
+                    try:
+                        return self._pay(candidate, amount)
+                    except self.NOT_SENT as e:
+                        cause = e
+            raise GatewayUnavailable('No payment gateway is available') from cause
+        if gateway not in self._dispatch:
             return "Invalid gateway selection"
+        if not self._breakers[gateway].allow():
+            raise GatewayUnavailable(f'Circuit for {gateway!r} is open')
+        return self._pay(gateway, amount)
+
+    def _pay(self, gateway, amount):
+        pay, _ = self._dispatch[gateway]
+        metrics = self._metrics[gateway]
+        with self._slots[gateway]:
+            metrics.begin()
+            start = time.perf_counter()
+            ok = False
+            try:
+                result = pay(amount)
+                ok = True
+                return result
+            finally:
+                metrics.observe(time.perf_counter() - start, ok)
+                self._breakers[gateway].record(ok)
+
+    def _route(self):
+        """
+        Gateways whose circuit would let a call through: those with a free
+        slot first, then by lowest recent p95.
+        """
+        candidates = [name for name, breaker in self._breakers.items() if breaker.available()]
+        return sorted(candidates, key=lambda name: (
+            self._metrics[name].in_flight >= self._dispatch[name][1], self._metrics[name].p95()
+        ))
+
+    def metrics_text(self):
+        """Gateway metrics in the Prometheus text exposition format."""
+        lines = [
+            '# HELP payment_gateway_latency_seconds Payment call latency.',
+            '# TYPE payment_gateway_latency_seconds histogram',
+        ]
+        for name, metrics in self._metrics.items():
+            cumulative = 0
+            for bound, count in zip(GatewayMetrics.BUCKETS + (float('inf'),), metrics.bucket_counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'payment_gateway_latency_seconds_bucket{{gateway="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'payment_gateway_latency_seconds_sum{{gateway="{name}"}} {metrics.latency_sum}')
+            lines.append(f'payment_gateway_latency_seconds_count{{gateway="{name}"}} {metrics.requests}')
+        for metric, kind, help_text, value in (
+            ('payment_gateway_requests_total', 'counter', 'Payment calls.', lambda n: self._metrics[n].requests),
+            ('payment_gateway_errors_total', 'counter', 'Failed payment calls.', lambda n: self._metrics[n].errors),
+            ('payment_gateway_in_flight', 'gauge', 'Payment calls in progress.', lambda n: self._metrics[n].in_flight),
+            ('payment_gateway_recent_error_ratio', 'gauge', 'Share of recent calls that failed.',
+             lambda n: self._metrics[n].error_rate()),
+            ('payment_gateway_recent_p95_seconds', 'gauge', 'Recent 95th percentile latency.',
+             lambda n: self._metrics[n].p95()),
+            ('payment_gateway_circuit_open', 'gauge', '1 while the circuit is not closed.',
+             lambda n: int(self._breakers[n].state != CircuitBreaker.CLOSED)),
+        ):
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} {kind}')
+            lines.extend(f'{metric}{{gateway="{name}"}} {value(name)}' for name in self._metrics)
+        return '\n'.join(lines) + '\n'
+
+    def write_metrics(self, path):
+        """Atomically write the metrics file, e.g. for a node_exporter textfile collector."""
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(self.metrics_text())
+        os.replace(tmp, path)
+
+    def serve_metrics(self, port=9464, host='127.0.0.1'):
+        """Serve the metrics over HTTP from a daemon thread; returns the server."""
+        facade = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = facade.metrics_text().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def process_payments(self, batch):
+        """
+        Processes (amount, gateway) pairs. Payments are grouped by gateway
+        and each group runs concurrently within that gateway's limit; `ANY`
+        payments are routed one by one as they run, like `process_payment`.
+        Results come back in input order; a payment that failed yields its
+        exception instead, so one failure does not hide the payments that
+        went through.
+        """
+        batch = list(batch)
+        results = [None] * len(batch)
+        groups = {}
+        for index, (amount, gateway) in enumerate(batch):
+            if gateway in self._dispatch or gateway == self.ANY:
+                groups.setdefault(gateway, []).append((index, amount))
+            else:
+                results[index] = "Invalid gateway selection"
+
+        executors = []
+        try:
+            futures = []
+            for gateway, payments in groups.items():
+                if gateway == self.ANY:
+                    max_concurrency = sum(limit for _, limit in self._dispatch.values())
+                else:
+                    _, max_concurrency = self._dispatch[gateway]
+                executor = ThreadPoolExecutor(min(max_concurrency, len(payments)))
+                executors.append(executor)
+                futures.extend(
+                    (index, executor.submit(self.process_payment, amount, gateway)) for index, amount in payments
+                )
+            for index, future in futures:
+                error = future.exception()
+                results[index] = future.result() if error is None else error
+        finally:
+            for executor in executors:
+                executor.shutdown()
+        return results
+
+
+# Step 5: Idempotency layer in front of the facade
+
+class IdempotencyKeyNotStored(Exception):
+    """The payment went through but its idempotency key could not be stored; see `result`."""
+
+    def __init__(self, key, result):
+        super().__init__(f"Payment for idempotency key {key!r} succeeded but the key was not stored")
+        self.result = result
+
+
+class IdempotencyStore(ABC):
+    """Completed results by idempotency key, each with an expiry time (epoch seconds)."""
+
+    def check(self, request):
+        """Raise if `request` could not be stored; called before the payment is made."""
+
+    @abstractmethod
+    def get(self, key):
+        """Return (request, result) for an unexpired key, or None."""
+        pass
+
+    @abstractmethod
+    def put(self, key, request, result, expires_at):
+        pass
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    """Bounded in-memory store; the least recently used entries are evicted first."""
+
+    def __init__(self, max_entries=10_000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            request, result, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return request, result
+
+    def put(self, key, request, result, expires_at):
+        with self._lock:
+            self._entries[key] = (request, result, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SqliteIdempotencyStore(IdempotencyStore):
+    """
+    Persistent store, so completed keys survive a restart. Requests and
+    results are stored as JSON. Expired and surplus entries are trimmed
+    every `trim_every` puts, so the table can briefly hold up to that many
+    entries more than `max_entries`.
+    """
+
+    def __init__(self, path, max_entries=1_000_000, trim_every=1000):
+        self.max_entries = max_entries
+        self.trim_every = trim_every
+        self._puts = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency ("
+            "key TEXT PRIMARY KEY, request TEXT, result TEXT, expires_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idempotency_expiry ON idempotency (expires_at)")
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT request, result FROM idempotency WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), json.loads(row[1])
+
+    def check(self, request):
+        json.dumps(request)
+
+    def put(self, key, request, result, expires_at):
+        row = (key, json.dumps(request), json.dumps(result), expires_at)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("INSERT OR REPLACE INTO idempotency VALUES (?, ?, ?, ?)", row)
+                self._puts += 1
+                if self._puts % self.trim_every == 0:
+                    self._trim()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _trim(self):
+        self._conn.execute("DELETE FROM idempotency WHERE expires_at <= ?", (time.time(),))
+        surplus = self._conn.execute("SELECT COUNT(*) FROM idempotency").fetchone()[0] - self.max_entries
+        if surplus > 0:
+            # keep the entries that expire last
+            self._conn.execute(
+                "DELETE FROM idempotency WHERE key IN (SELECT key FROM idempotency "
+                "ORDER BY expires_at LIMIT ?)",
+                (surplus,),
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+class IdempotentPaymentFacade:
+    """
+    Wraps a PaymentFacade so that retries with the same idempotency key
+    reach the gateway at most once. Completed results are kept in `store`
+    for `ttl` seconds, and concurrent duplicates wait for the call already
+    in flight. Failed payments are not stored, so they can be retried.
+    """
+
+    def __init__(self, facade=None, store=None, ttl=24 * 60 * 60):
+        self._facade = facade or PaymentFacade()
+        self._store = store or MemoryIdempotencyStore()
+        self._ttl = ttl
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def process_payment(self, amount, gateway, idempotency_key):
+        """
+        Raises IdempotencyKeyNotStored, carrying the result, if the payment
+        went through but storing its key failed; retrying it may charge again.
+        """
+        request = [amount, gateway]
+        self._store.check(request)
+        with self._lock:
+            stored = self._store.get(idempotency_key)
+            in_flight = None if stored is not None else self._in_flight.get(idempotency_key)
+            if stored is None and in_flight is None:
+                future = Future()
+                self._in_flight[idempotency_key] = (request, future)
+        if stored is not None:
+            self._check(idempotency_key, stored[0], request)
+            return stored[1]
+        if in_flight is not None:
+            self._check(idempotency_key, in_flight[0], request)
+            return in_flight[1].result()
+
+        try:
+            result = self._facade.process_payment(amount, gateway)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[idempotency_key]
+            future.set_exception(e)
+            raise
+        try:
+            with self._lock:
+                self._store.put(idempotency_key, request, result, time.time() + self._ttl)
+        except Exception as e:
+            raise IdempotencyKeyNotStored(idempotency_key, result) from e
+        finally:
+            with self._lock:
+                del self._in_flight[idempotency_key]
+            # waiting duplicates get the result either way; the payment was made
+            future.set_result(result)
+        return result
+
+    @staticmethod
+    def _check(key, stored, request):
+        if list(stored) != request:
+            raise ValueError(f"Idempotency key {key!r} was already used for a different payment")
 
 
 def test():
@@ -62,3 +515,26 @@ def test():
     print(payment_facade.process_payment(150, 'stripe'))
     print(payment_facade.process_payment(200, 'crypto'))
     print(payment_facade.process_payment(300, 'invalid_gateway'))
+
+
+def benchmark(payments=400, latency=0.01):
+    """Payments/sec one at a time vs process_payments() against simulated gateways."""
+    for name, limit in (('sim-a', 8), ('sim-b', 4), ('sim-c', 2)):
+        register_gateway(name, lambda name=name: SimulatedGateway(name, latency), 'charge', limit)
+    try:
+        facade = PaymentFacade()
+        rng = random.Random(0)
+        batch = [(i, rng.choice(('sim-a', 'sim-b', 'sim-c'))) for i in range(payments)]
+
+        start = time.perf_counter()
+        serial = [facade.process_payment(amount, gateway) for amount, gateway in batch[:50]]
+        serial_rate = len(serial) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results = facade.process_payments(batch)
+        batch_rate = len(results) / (time.perf_counter() - start)
+        assert results[:50] == serial
+        print(f"one at a time: {serial_rate:,.0f} payments/s, batched: {batch_rate:,.0f} payments/s")
+    finally:
+        for name in ('sim-a', 'sim-b', 'sim-c'):
+            del _gateways[name]